@@ -0,0 +1,163 @@
+"""
+JWT-аутентификация без запроса пользователя на каждый запрос.
+
+Токен, выданный UserAccessToken, несёт username, роль, is_superuser
+и версию пользователя — поколение ресурса user_auth(id) в кэше
+RESPONSE_CACHE_ALIAS (см. api.cache). Любое сохранение пользователя,
+кроме обновления last_login, его удаление и импорт из CSV увеличивают
+поколение (см. api.signals и команду import_csv), поэтому токены
+со старой версией проверяются по БД. Если кэш виден только текущему
+процессу, смену версии в другом процессе не заметить, и пользователь
+всегда читается из БД.
+
+Проверенные токены запоминаются в ограниченном LRU по дайджесту, так
+что повторный запрос с тем же токеном не проверяет подпись заново.
+Представлениям отдаётся облегчённый User: загружены только поля из
+токена, остальные отложены и подгружаются при обращении.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.cache import get_generations, is_shared_cache, user_auth
+from api.constants import AUTH_TOKEN_CACHE_SIZE
+from users.models import User
+
+VERSION_CLAIM = 'user_version'
+# Поля пользователя, которые несёт токен и которых хватает правам доступа.
+CLAIM_FIELDS = ('username', 'role', 'is_superuser')
+
+LIGHT_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in ('id', 'is_active') + CLAIM_FIELDS
+]
+
+VerifiedToken = namedtuple(
+    'VerifiedToken', 'user_id values version expires_at token'
+)
+
+
+def get_user_version(user_id):
+    return get_generations([user_auth(user_id)])[0]
+
+
+def token_digest(raw_token):
+    return hashlib.blake2b(raw_token, digest_size=16).digest()
+
+
+class UserAccessToken(AccessToken):
+    """Access-токен с ролью и версией пользователя в claims."""
+
+    @classmethod
+    def for_user(cls, user, version=None):
+        """
+        version нужно прочитать до загрузки user, как в
+        VersionedJWTAuthentication.reload: тогда изменение пользователя
+        между чтениями оставит в токене старую версию, и токен будет
+        проверен по БД. Без version она читается здесь, и токен
+        с устаревшими claims может получить свежую версию.
+        """
+        if version is None:
+            version = get_user_version(user.pk)
+        token = super().for_user(user)
+        for name in CLAIM_FIELDS:
+            token[name] = getattr(user, name)
+        token[VERSION_CLAIM] = version
+        return token
+
+
+class TokenLRU:
+    """Потокобезопасный LRU проверенных токенов ограниченного размера."""
+
+    def __init__(self, maxsize=AUTH_TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+verified_tokens = TokenLRU()
+
+
+def light_user(user_id, values):
+    """User с полями из токена; остальные поля отложены."""
+    values = dict(values, id=user_id, is_active=True)
+    return User.from_db(
+        User.objects.db, LIGHT_FIELDS,
+        [values[attname] for attname in LIGHT_FIELDS]
+    )
+
+
+class VersionedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, читающая пользователя из токена.
+
+    БД запрашивается, только если версия в токене устарела или её нет
+    (токены, выданные до появления claims); результат такой проверки
+    тоже запоминается до следующей смены версии.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        key = token_digest(raw_token)
+        entry = verified_tokens.get(key)
+        if entry is None or entry.expires_at <= time.time():
+            entry = self.verify(raw_token)
+        version = get_user_version(entry.user_id)
+        if entry.version != version or not is_shared_cache():
+            entry = self.reload(entry, version)
+        verified_tokens.set(key, entry)
+        return light_user(entry.user_id, entry.values), entry.token
+
+    def verify(self, raw_token):
+        """Проверяет подпись и срок действия, разбирает claims."""
+        token = self.get_validated_token(raw_token)
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            # Отсутствие id обрабатывает и сообщает базовый класс.
+            self.get_user(token)
+        version = token.get(VERSION_CLAIM)
+        values = {name: token.get(name) for name in CLAIM_FIELDS}
+        if None in values.values():
+            version = None
+        return VerifiedToken(user_id, values, version, token['exp'], token)
+
+    def reload(self, entry, version):
+        """
+        Загружает пользователя из БД для версии, прочитанной до запроса:
+        если версия сменится во время загрузки, проверка повторится.
+        """
+        user = self.get_user(entry.token)
+        values = {name: getattr(user, name) for name in CLAIM_FIELDS}
+        return entry._replace(values=values, version=version)
@@ -0,0 +1,191 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# Бэкенды, содержимое которых не видно другим процессам.
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def is_shared_cache():
+    """Видны ли поколения всем процессам, а не только текущему."""
+    return not isinstance(get_cache(), PROCESS_LOCAL_BACKENDS)
+
+
+def generation_key(resource):
+    return f'api:generation:{resource}'
+
+
+def title_reviews(title_id):
+    """Ресурс «отзывы произведения»."""
+    return f'reviews:title:{title_id}'
+
+
+def review_comments(review_id):
+    """Ресурс «комментарии к отзыву»."""
+    return f'comments:review:{review_id}'
+
+
+def user_auth(user_id):
+    """Ресурс «роль и статус пользователя», которым подписаны его токены."""
+    return f'auth:user:{user_id}'
+
+
+def get_generations(resources):
+    """Возвращает текущие номера поколений ресурсов.
+
+    Поколение — время последнего изменения в наносекундах.
+    Отсутствующий счётчик заводится текущим временем, чтобы после
+    вытеснения из кэша не совпасть со старыми ключами.
+    """
+    cache = get_cache()
+    keys = [generation_key(resource) for resource in resources]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns())
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(*resources):
+    """Инвалидирует закэшированные ответы ресурсов после коммита."""
+    def bump():
+        cache = get_cache()
+        keys = [generation_key(resource) for resource in resources]
+        generations = cache.get_many(keys)
+        now = time.time_ns()
+        cache.set_many({
+            key: max(now, generations.get(key, 0) + 1) for key in keys
+        }, None)
+    transaction.on_commit(bump)
+
+
+def normalize_query(query_params):
+    """Канонический вид строки запроса: ключи и значения отсортированы."""
+    return urlencode(sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+    ))
+
+
+class VersionedReadMixin:
+    """
+    Базовый класс чтения, версионированного поколениями ресурсов.
+
+    Ресурсы, от которых зависит ответ, перечислены в cache_resources
+    или возвращаются get_cache_resources(); любая запись в них
+    увеличивает поколение (см. api.signals).
+    """
+    cache_resources = ()
+
+    def get_cache_resources(self):
+        return self.cache_resources
+
+    def get_generations(self):
+        if not hasattr(self, '_generations'):
+            self._generations = get_generations(self.get_cache_resources())
+        return self._generations
+
+    def get_version_tag(self, request):
+        # Схема и хост входят в тег: ответ содержит абсолютные ссылки
+        # next и previous.
+        return '{}:{}://{}{}?{}'.format(
+            ':'.join(map(str, self.get_generations())),
+            request.scheme,
+            request.get_host(),
+            request.path,
+            normalize_query(request.query_params),
+        )
+
+
+class CachedReadMixin(VersionedReadMixin):
+    """
+    Кэширует данные ответов list.
+
+    Повторное чтение не обращается к ORM и сериализаторам,
+    старые ключи перестают использоваться после смены поколения.
+    """
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = f'api:response:{self.get_version_tag(request)}'
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class ConditionalGetMixin(VersionedReadMixin):
+    """
+    Поддержка If-None-Match и If-Modified-Since для list и retrieve.
+
+    ETag и Last-Modified вычисляются из поколений ресурсов без
+    обращения к БД, поэтому 304 возвращается до выполнения запроса.
+    """
+
+    def get_etag(self, request):
+        tag = '{}:{}'.format(
+            self.get_version_tag(request),
+            request.accepted_renderer.format,
+        )
+        return '"{}"'.format(hashlib.md5(tag.encode()).hexdigest())
+
+    def get_last_modified(self):
+        """
+        Секунда последнего изменения или None, если она ещё не прошла.
+
+        Last-Modified имеет точность в секунду: изменение позже в той же
+        секунде его не сдвинет, поэтому до конца секунды заголовок не
+        отдаётся и не сравнивается, а изменения различает ETag.
+        """
+        last_modified = max(self.get_generations()) // 10 ** 9
+        if last_modified >= int(time.time()):
+            return None
+        return last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        last_modified = self.get_last_modified()
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
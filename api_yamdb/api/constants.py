@@ -4,3 +4,18 @@ MAX_LENGTH_EMAIL = 254
 MAX_LENGTH_USERNAME = 150
 MAX_LENGTH_FIRST_NAME = 150
 MAX_LENGTH_LAST_NAME = 150
+
+CURSOR_DEFAULT_PAGE_SIZE = 10
+CURSOR_MAX_PAGE_SIZE = 100
+
+TITLE_BULK_MAX_SIZE = 1000
+
+EXPORT_CHUNK_SIZE = 2000
+
+REVIEW_EXISTS_MESSAGE = 'Вы уже оставляли отзыв на это произведение.'
+
+# Число проверенных JWT, которые помнит процесс (см. api.authentication).
+AUTH_TOKEN_CACHE_SIZE = 10000
+
+# Сколько секунд ждать блокировку базы корзин (см. api.throttling).
+THROTTLE_LOCK_TIMEOUT = 5
@@ -1,16 +1,35 @@
 from django_filters import rest_framework as filters
 
+from api.registry import category_registry, genre_registry
 from reviews.models import Title
+from reviews.search import filter_by_name
 
 
 class TitleFilter(filters.FilterSet):
     """Фильтр для произведения."""
-    category = filters.CharFilter(
-        field_name="category__slug", lookup_expr="exact")
-    genre = filters.CharFilter(field_name="genre__slug", lookup_expr="exact")
+    category = filters.CharFilter(method="filter_category")
+    genre = filters.CharFilter(method="filter_genre")
     year = filters.NumberFilter(field_name="year", lookup_expr="exact")
-    name = filters.CharFilter(field_name="name", lookup_expr="icontains")
+    name = filters.CharFilter(field_name="name", method="filter_name")
 
     class Meta:
         model = Title
         fields = ["category", "genre", "year", "name"]
+
+    def filter_category(self, queryset, name, value):
+        """Slug категории разрешается в id без JOIN с категориями."""
+        category_id = category_registry.get_id(value)
+        if category_id is None:
+            return queryset.none()
+        return queryset.filter(category_id=category_id)
+
+    def filter_genre(self, queryset, name, value):
+        """Slug жанра разрешается в id; JOIN только со связующей таблицей."""
+        genre_id = genre_registry.get_id(value)
+        if genre_id is None:
+            return queryset.none()
+        return queryset.filter(genre=genre_id)
+
+    def filter_name(self, queryset, name, value):
+        """Поиск по подстроке названия через полнотекстовый индекс."""
+        return filter_by_name(queryset, value)
@@ -0,0 +1,41 @@
+from users.models import User
+
+
+def get_user_identity_map(request):
+    """
+    Карта id -> User, общая для всего запроса.
+
+    Один и тот же автор представлен одним объектом, а текущий
+    пользователь берётся из request.user без повторной загрузки.
+    """
+    identity_map = getattr(request, '_user_identity_map', None)
+    if identity_map is None:
+        identity_map = {}
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            identity_map[user.pk] = user
+        request._user_identity_map = identity_map
+    return identity_map
+
+
+def attach_authors(request, objects):
+    """Проставляет объектам авторов, загружая недостающих одним запросом."""
+    objects = [
+        obj for obj in objects
+        if not type(obj).author.field.is_cached(obj)
+    ]
+    if not objects:
+        return
+    identity_map = (
+        get_user_identity_map(request) if request is not None else {}
+    )
+    missing = {obj.author_id for obj in objects} - identity_map.keys()
+    if missing:
+        for user in User.objects.filter(pk__in=missing).only(
+            'id', 'username'
+        ):
+            identity_map[user.pk] = user
+    for obj in objects:
+        author = identity_map.get(obj.author_id)
+        if author is not None:
+            type(obj).author.field.set_cached_value(obj, author)
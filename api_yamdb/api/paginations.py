@@ -1,6 +1,168 @@
-from rest_framework.pagination import LimitOffsetPagination
+import base64
+import json
+from collections import OrderedDict
 
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, LimitOffsetPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-class ReviewPagination(LimitOffsetPagination):
+from api.constants import CURSOR_DEFAULT_PAGE_SIZE, CURSOR_MAX_PAGE_SIZE
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по паре (поле сортировки, id).
+
+    Курсор хранит значения ключа крайнего объекта страницы, поэтому
+    следующая страница выбирается условием WHERE по индексу,
+    без OFFSET и без COUNT(*). Поле сортировки не должно быть NULL.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def __init__(self, ordering, page_size=CURSOR_DEFAULT_PAGE_SIZE,
+                 max_page_size=CURSOR_MAX_PAGE_SIZE):
+        self.ordering = ordering
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """Условие «строго после позиции» для составного ключа."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        position = [
+            self.field_value(obj, field.lstrip('-'))
+            for field in self.ordering
+        ]
+        payload = json.dumps([position, int(reverse)], default=str)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    @staticmethod
+    def field_value(obj, name):
+        """Значение поля объекта или строки values()."""
+        value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            position, reverse = json.loads(
+                base64.urlsafe_b64decode(encoded.encode()).decode()
+            )
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
+
+
+class CursorOptInMixin:
+    """
+    Включает курсорную пагинацию, если в запросе передан параметр cursor
+    (пустое значение — первая страница). Иначе работает исходный класс.
+
+    Порядок ключа задаётся атрибутом представления cursor_ordering.
+    """
+    default_cursor_ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(
+                getattr(view, 'cursor_ordering',
+                        self.default_cursor_ordering)
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class ReviewPagination(CursorOptInMixin, LimitOffsetPagination):
     default_limit = 10
     max_limit = 100
+
+
+class PageNumberCursorPagination(CursorOptInMixin, PageNumberPagination):
+    """Постраничная пагинация по умолчанию с курсорным режимом по запросу."""
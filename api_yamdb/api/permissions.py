@@ -20,7 +20,7 @@ class IsAuthorAdminModerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return (obj.author == request.user
+        return (obj.author_id == request.user.id
                 or request.user.is_moderator
                 or request.user.is_admin)
 
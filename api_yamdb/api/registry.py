@@ -0,0 +1,142 @@
+import threading
+
+from django.core.signals import request_finished, request_started
+from django.db import router
+from rest_framework import serializers
+
+from api.cache import get_generations
+from reviews.models import Category, Genre, Title
+
+
+# Метка текущего HTTP-запроса потока; None вне запроса.
+request_scope = threading.local()
+
+
+def open_request_scope(**kwargs):
+    request_scope.token = object()
+
+
+def close_request_scope(**kwargs):
+    request_scope.token = None
+
+
+request_started.connect(open_request_scope)
+request_finished.connect(close_request_scope)
+
+
+class SlugRegistry:
+    """
+    Процессный справочник slug -> объект для маленьких таблиц.
+
+    Таблица загружается целиком одним запросом и перечитывается,
+    только когда меняется поколение ресурса (см. api.signals).
+    Поколения хранятся в кэше RESPONSE_CACHE_ALIAS; если он общий
+    для процессов (по умолчанию файловый), запись через любой процесс
+    инвалидирует справочник во всех остальных. В пределах HTTP-запроса
+    поколение читается один раз, а не при каждом обращении.
+    """
+
+    def __init__(self, model, resource):
+        self.model = model
+        self.resource = resource
+        self._generation = None
+        self._by_slug = {}
+        self._by_id = {}
+        self._checked = threading.local()
+
+    def __deepcopy__(self, memo):
+        # DRF копирует аргументы полей для каждого сериализатора,
+        # а справочник должен оставаться общим на процесс.
+        return self
+
+    def _refresh(self):
+        token = getattr(request_scope, 'token', None)
+        if token is not None and self._generation is not None and (
+            getattr(self._checked, 'token', None) is token
+        ):
+            return self._by_slug, self._by_id
+        generation, = get_generations([self.resource])
+        self._checked.token = token
+        if generation != self._generation:
+            rows = self.model.objects.values_list('id', 'name', 'slug')
+            by_slug = {}
+            by_id = {}
+            for pk, name, slug in rows:
+                by_slug[slug] = pk
+                by_id[pk] = {'name': name, 'slug': slug}
+            self._by_slug, self._by_id = by_slug, by_id
+            self._generation = generation
+        return self._by_slug, self._by_id
+
+    def invalidate(self):
+        self._generation = None
+
+    def get_id(self, slug):
+        by_slug, _ = self._refresh()
+        return by_slug.get(slug)
+
+    def get_object(self, slug):
+        """Экземпляр модели без обращения к БД или None."""
+        by_slug, by_id = self._refresh()
+        pk = by_slug.get(slug)
+        if pk is None:
+            return None
+        data = by_id[pk]
+        return self.model.from_db(
+            router.db_for_read(self.model),
+            ['id', 'name', 'slug'],
+            (pk, data['name'], data['slug'])
+        )
+
+    def render(self, pk):
+        """Данные объекта в формате {'name', 'slug'} или None."""
+        _, by_id = self._refresh()
+        data = by_id.get(pk)
+        return dict(data) if data is not None else None
+
+    def render_many(self, pks):
+        """Данные объектов, упорядоченные по названию, как в Meta."""
+        _, by_id = self._refresh()
+        items = [dict(by_id[pk]) for pk in pks if pk in by_id]
+        return sorted(items, key=lambda item: item['name'])
+
+
+genre_registry = SlugRegistry(Genre, 'genres')
+category_registry = SlugRegistry(Category, 'categories')
+
+
+def load_genre_ids(title_ids):
+    """Одним запросом к связующей таблице загружает id жанров."""
+    genre_ids = {title_id: [] for title_id in title_ids}
+    if genre_ids:
+        rows = Title.genre.through.objects.filter(
+            title_id__in=genre_ids
+        ).values_list('title_id', 'genre_id')
+        for title_id, genre_id in rows:
+            genre_ids[title_id].append(genre_id)
+    return genre_ids
+
+
+def attach_genre_ids(titles):
+    """Проставляет произведениям атрибут genre_ids."""
+    titles = [title for title in titles if not hasattr(title, 'genre_ids')]
+    genre_ids = load_genre_ids(title.pk for title in titles)
+    for title in titles:
+        title.genre_ids = genre_ids[title.pk]
+
+
+class RegistrySlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который ищет объект в справочнике, а не в БД."""
+
+    def __init__(self, registry, **kwargs):
+        self.registry = registry
+        super().__init__(slug_field='slug', **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, (dict, list)):
+            self.fail('invalid')
+        obj = self.registry.get_object(str(data))
+        if obj is None:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=data)
+        return obj
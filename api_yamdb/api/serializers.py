@@ -1,15 +1,26 @@
-from django.conf import settings
-from django.core.mail import send_mail
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from rest_framework import serializers
 from rest_framework.exceptions import NotFound, ValidationError
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.settings import api_settings
 
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.search import index_titles
+from api.authentication import UserAccessToken, get_user_version
+from api.cache import bump_generation
+from api.identity import attach_authors
+from api.registry import (RegistrySlugRelatedField, attach_genre_ids,
+                          category_registry, genre_registry, load_genre_ids)
 from api.constants import (USERNAME_REGEX, MAX_LENGTH_USERNAME,
                            MAX_LENGTH_FIRST_NAME, MAX_LENGTH_LAST_NAME,
-                           MAX_LENGTH_EMAIL)
+                           MAX_LENGTH_EMAIL, TITLE_BULK_MAX_SIZE,
+                           REVIEW_EXISTS_MESSAGE)
 from reviews.constants import MIN_SCORE, MAX_SCORE
 from users.models import User
+from users.codes import consume_code
+from users.outbox import enqueue_email
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -24,49 +35,150 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["name", "slug"]
 
 
+class TitleListSerializer(serializers.ListSerializer):
+    """Загружает жанры всей страницы одним запросом."""
+
+    def to_representation(self, data):
+        titles = list(data.all() if hasattr(data, 'all') else data)
+        attach_genre_ids(titles)
+        return super().to_representation(titles)
+
+
 class TitleReadSerializer(serializers.ModelSerializer):
-    genre = GenreSerializer(many=True, read_only=True)
-    category = CategorySerializer(read_only=True)
-    rating = serializers.IntegerField(read_only=True, default=None)
+    """Жанры и категории отдаются из процессного справочника."""
+    genre = serializers.SerializerMethodField()
+    category = serializers.SerializerMethodField()
+    rating = serializers.FloatField(read_only=True, default=None)
 
     class Meta:
         model = Title
         fields = ["id", "name", "year", "rating",
                   "description", "genre", "category"]
+        list_serializer_class = TitleListSerializer
+
+    def get_genre(self, instance):
+        attach_genre_ids([instance])
+        return genre_registry.render_many(instance.genre_ids)
+
+    def get_category(self, instance):
+        """Если категория отсутствует, возвращаем пустой объект категории."""
+        return (category_registry.render(instance.category_id)
+                or CategorySerializer(None).data)
 
     def to_representation(self, instance):
         """Модифицируем данные возвращаемые API.
-        Если описание отсутствует, возвращаем пустую строку.
-        Если категория отсутствует, возвращаем пустой объект
-        категории."""
+        Если описание отсутствует, возвращаем пустую строку."""
         representation = super().to_representation(instance)
         if not representation.get("description"):
             representation["description"] = ""
         if not representation.get("rating"):
             representation["rating"] = None
-        if instance.category is None:
-            representation["category"] = CategorySerializer(None).data
         return representation
 
 
+class TitleRowListSerializer(serializers.ListSerializer):
+    """Загружает жанры всей страницы строк одним запросом."""
+
+    def to_representation(self, data):
+        rows = list(data)
+        genre_ids = load_genre_ids(row["id"] for row in rows)
+        return [
+            self.child.to_representation(row, genre_ids[row["id"]])
+            for row in rows
+        ]
+
+
+class TitleRowSerializer(serializers.BaseSerializer):
+    """
+    Быстрый путь списка произведений по строкам .values().
+
+    Собирает словари напрямую, без экземпляров моделей и вложенных
+    сериализаторов. Результат должен совпадать с TitleReadSerializer
+    байт в байт (см. настройку TITLE_LIST_VALUES_PATH).
+    """
+    values_fields = ("id", "name", "year", "rating",
+                     "description", "category_id")
+
+    class Meta:
+        list_serializer_class = TitleRowListSerializer
+
+    def to_representation(self, row, genre_ids=None):
+        if genre_ids is None:
+            genre_ids = load_genre_ids([row["id"]])[row["id"]]
+        rating = row["rating"]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "year": row["year"],
+            "rating": float(rating) if rating else None,
+            "description": row["description"] or "",
+            "genre": genre_registry.render_many(genre_ids),
+            "category": (category_registry.render(row["category_id"])
+                         or CategorySerializer(None).data),
+        }
+
+
+class TitleBulkListSerializer(serializers.ListSerializer):
+    """Массовое создание произведений в одной транзакции."""
+
+    def to_internal_value(self, data):
+        # Размер проверяется до валидации элементов, чтобы слишком
+        # большой массив отклонялся сразу.
+        if isinstance(data, list) and len(data) > TITLE_BULK_MAX_SIZE:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f"Нельзя создать больше {TITLE_BULK_MAX_SIZE} "
+                "произведений за один запрос."
+            ]})
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        """Вставляет произведения и связи с жанрами через bulk_create."""
+        titles = []
+        genres = []
+        for item in validated_data:
+            item = dict(item)
+            genres.append(list({
+                genre.pk: genre for genre in item.pop("genre", [])
+            }.values()))
+            titles.append(Title(**item))
+
+        through = Title.genre.through
+        with transaction.atomic():
+            Title.objects.bulk_create_with_pks(titles)
+            through.objects.bulk_create([
+                through(title_id=title.pk, genre_id=genre.pk)
+                for title, title_genres in zip(titles, genres)
+                for genre in title_genres
+            ])
+            index_titles(titles)
+            bump_generation("titles")
+
+        for title, title_genres in zip(titles, genres):
+            title.genre_ids = [genre.pk for genre in title_genres]
+        return titles
+
+
 class TitleWriteSerializer(serializers.ModelSerializer):
-    genre = serializers.SlugRelatedField(
+    genre = RegistrySlugRelatedField(
+        registry=genre_registry,
         queryset=Genre.objects.all(),
-        slug_field="slug",
         many=True,
+        write_only=True,
         help_text="Жанр отсутствует в БД.",
     )
-    category = serializers.SlugRelatedField(
+    category = RegistrySlugRelatedField(
+        registry=category_registry,
         queryset=Category.objects.all(),
-        slug_field="slug",
+        write_only=True,
         help_text="Категория отсутствует в БД.",
     )
-    rating = serializers.IntegerField(read_only=True, default=None)
+    rating = serializers.FloatField(read_only=True, default=None)
 
     class Meta:
         model = Title
         fields = ["id", "name", "year", "description",
                   "genre", "category", "rating"]
+        list_serializer_class = TitleBulkListSerializer
 
     def validate_genre(self, value):
         """Проверяем, что наличие данных жанра."""
@@ -78,19 +190,23 @@ class TitleWriteSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Модифицируем данные возвращаемые API.
         Если описание отсутствует, возвращаем пустую строку.
-        Заменяем слаги на полные данные для жанра и категории."""
+        Вместо слагов отдаём полные данные жанра и категории
+        из справочника, не обращаясь к связанным объектам."""
         representation = super().to_representation(instance)
         if not representation.get("description"):
             representation["description"] = ""
         if not representation.get("rating"):
             representation["rating"] = None
-        representation["genre"] = GenreSerializer(
-            instance.genre.all(), many=True).data
+        attach_genre_ids([instance])
+        representation["genre"] = genre_registry.render_many(
+            instance.genre_ids)
         representation["category"] = (
-            CategorySerializer(instance.category).data
-            if instance.category else CategorySerializer(None).data
+            category_registry.render(instance.category_id)
+            or CategorySerializer(None).data
+        )
+        return OrderedDict(
+            (field, representation[field]) for field in self.Meta.fields
         )
-        return representation
 
     def create(self, validated_data):
         """Создаем произведение с жанрами и категорией."""
@@ -105,21 +221,71 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         return title
 
     def update(self, instance, validated_data):
-        """Обновляем произведение с жанрами и категорией."""
-        genres = validated_data.pop("genre", [])
-        category = validated_data.pop("category", None)
-        # Обновляем заполненные поля произведения
+        """Обновляем только изменившиеся поля и жанры произведения.
+
+        Поля сохраняются через save(update_fields=...), жанры меняются
+        разницей добавленных и удалённых связей. Если жанры не переданы
+        (PATCH), связи не трогаются. Ответ строится из справочников
+        и уже известных id жанров, без повторного чтения.
+        """
+        genres = validated_data.pop("genre", None)
+        update_fields = []
         for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            if attr == "category":
+                if instance.category_id != value.pk:
+                    instance.category = value
+                    update_fields.append("category")
+            elif getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                update_fields.append(attr)
+
+        with transaction.atomic():
+            if update_fields:
+                instance.save(update_fields=update_fields)
+            if genres is not None:
+                self.update_genres(instance, genres)
+        return instance
 
-        instance.genre.set(genres)
-        instance.category = category
-        instance.save()
+    @staticmethod
+    def update_genres(instance, genres):
+        """Применяет к связям с жанрами минимальную разницу."""
+        current = set(load_genre_ids([instance.pk])[instance.pk])
+        wanted = {genre.pk for genre in genres}
+        through = Title.genre.through
+        removed = current - wanted
+        added = wanted - current
+        if removed:
+            through.objects.filter(
+                title_id=instance.pk, genre_id__in=removed
+            ).delete()
+        if added:
+            through.objects.bulk_create([
+                through(title_id=instance.pk, genre_id=genre_id)
+                for genre_id in added
+            ])
+        if removed or added:
+            bump_generation("titles")
+        instance.genre_ids = list(wanted)
+
+
+class AuthorListSerializer(serializers.ListSerializer):
+    """Загружает авторов всей страницы одним запросом."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        attach_authors(self.context.get('request'), items)
+        return super().to_representation(items)
+
+
+class AuthorSerializerMixin:
+    """Автор берётся из карты пользователей запроса, а не по запросу к БД."""
 
-        return instance
+    def to_representation(self, instance):
+        attach_authors(self.context.get('request'), [instance])
+        return super().to_representation(instance)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(AuthorSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели отзыва (Review)."""
     author = serializers.SlugRelatedField(
         slug_field='username',
@@ -137,22 +303,29 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
+        list_serializer_class = AuthorListSerializer
 
-    def validate(self, data):
-        """Проверяет уникальность отзыва от автора для произведения."""
-        request = self.context['request']
-        title = self.context['view'].get_title()
-        author = request.user
-
-        if request.method == 'POST':
-            if title.reviews.filter(author=author).exists():
-                raise serializers.ValidationError(
-                    'Вы уже оставляли отзыв на это произведение.'
-                )
-        return data
+    def create(self, validated_data):
+        """
+        Создаёт отзыв, полагаясь на ограничение unique_review.
+
+        Повторный отзыв отклоняется самой БД, поэтому отдельный
+        запрос на проверку уникальности не нужен.
+        """
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title=validated_data['title'],
+                author=validated_data['author']
+            ).exists():
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [REVIEW_EXISTS_MESSAGE]
+            })
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(AuthorSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели комментариев (Comment)."""
     author = serializers.SlugRelatedField(
         slug_field='username',
@@ -161,6 +334,7 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date')
+        list_serializer_class = AuthorListSerializer
 
 
 class SignUpSerializer(serializers.Serializer):
@@ -202,50 +376,56 @@ class SignUpSerializer(serializers.Serializer):
             )
         return value
 
-    def create(self, validated_data):
-        """Создание нового пользователя или обновление существующего."""
-        email = validated_data['email']
-        username = validated_data['username']
-
-        user_with_same_email = User.objects.filter(email=email).first()
-        user_with_same_username = User.objects.filter(
-            username=username
-        ).first()
-
+    @staticmethod
+    def find_conflicts(users, username, email):
+        """Ошибки для пользователей, совпавших по username или email."""
         errors = {}
-
-        if user_with_same_username and user_with_same_username.email != email:
-            errors['username'] = [
-                'Username уже существует с другим email.'
-            ]
-
-        if user_with_same_email and user_with_same_email.username != username:
-            errors['email'] = [
-                'Email уже зарегистрирован другим пользователем.'
-            ]
-
-        if errors:
-            raise ValidationError(errors)
-
-        user, created = User.objects.get_or_create(
-            username=username,
-            defaults={'email': email}
-        )
-
-        if not created and user.email != email:
-            raise ValidationError({
-                'username': [
+        for user in users:
+            if user.username == username and user.email != email:
+                errors['username'] = [
                     'Username уже существует с другим email.'
                 ]
-            })
+            if user.email == email and user.username != username:
+                errors['email'] = [
+                    'Email уже зарегистрирован другим пользователем.'
+                ]
+        return errors
+
+    def get_or_create_user(self, username, email):
+        """
+        Один SELECT по username или email и INSERT, если никого нет.
+        Если параллельная регистрация успела вставить ту же строку,
+        уникальные индексы отклонят INSERT и проверка повторится.
+        """
+        for attempt in range(2):
+            users = list(User.objects.filter(
+                Q(username=username) | Q(email=email)
+            ).only('id', 'username', 'email'))
+            errors = self.find_conflicts(users, username, email)
+            if errors:
+                raise ValidationError(errors)
+            if users:
+                return users[0]
+            try:
+                with transaction.atomic():
+                    return User.objects.create(
+                        username=username, email=email
+                    )
+            except IntegrityError:
+                if attempt:
+                    raise
 
-        user.set_new_confirmation_code()
+    def create(self, validated_data):
+        """Создание нового пользователя или выдача кода существующему."""
+        user = self.get_or_create_user(
+            validated_data['username'], validated_data['email']
+        )
+        code = user.set_new_confirmation_code()
 
-        send_mail(
+        enqueue_email(
             subject='Подтверждение почты',
-            message=f'Ваш код подтвeрждeния почты: {user.confirmation_code}',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
+            message=f'Ваш код подтвeрждeния почты: {code}',
+            recipient=user.email,
         )
         return user
 
@@ -256,19 +436,23 @@ class TokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField()
 
     def validate(self, data):
+        """
+        Код сверяется до обращения к таблице пользователей; пользователь
+        читается, только чтобы выдать токен или выбрать текст ошибки.
+        """
         username = data['username']
-        code = data['confirmation_code']
-
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            raise NotFound('Пользователь не найден.')
-
-        if user.confirmation_code != code:
+        user_id = consume_code(username, data['confirmation_code'])
+        user = version = None
+        if user_id is not None:
+            # Версия читается до пользователя (см. UserAccessToken).
+            version = get_user_version(user_id)
+            user = User.objects.filter(pk=user_id, username=username).first()
+        if user is None:
+            if not User.objects.filter(username=username).exists():
+                raise NotFound('Пользователь не найден.')
             raise ValidationError(['Неверный код подтверждения.'])
 
-        refresh = RefreshToken.for_user(user)
-        return {'token': str(refresh.access_token)}
+        return {'token': str(UserAccessToken.for_user(user, version))}
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import (bump_generation, review_comments, title_reviews,
+                       user_auth)
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genres(sender, **kwargs):
+    bump_generation('genres')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    bump_generation('categories')
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def invalidate_titles(sender, instance, **kwargs):
+    """Удаление произведения инвалидирует и его список отзывов."""
+    bump_generation('titles', title_reviews(instance.pk))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, action, **kwargs):
+    """Изменение жанров произведения инвалидирует произведения."""
+    if action.startswith('post_'):
+        bump_generation('titles')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviews(sender, instance, **kwargs):
+    """Отзывы меняют рейтинг, поэтому инвалидируют и произведения."""
+    bump_generation(
+        'titles',
+        title_reviews(instance.title_id),
+        review_comments(instance.pk),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    bump_generation(review_comments(instance.review_id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_authors(sender, instance, created, update_fields, **kwargs):
+    """Смена username меняет поле author в отзывах и комментариях."""
+    if created:
+        return
+    if update_fields is None or 'username' in update_fields:
+        bump_generation('authors')
+
+
+# Поля, смена которых не затрагивает выданные токены.
+TOKEN_NEUTRAL_FIELDS = frozenset({'last_login'})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None,
+                           created=False, **kwargs):
+    """Устаревшая версия заставляет перепроверить токены по БД."""
+    if created:
+        return
+    if update_fields is not None and (
+        set(update_fields) <= TOKEN_NEUTRAL_FIELDS
+    ):
+        return
+    bump_generation(user_auth(instance.pk))
+
+
+@receiver(connection_created)
+def enable_sqlite_wal(sender, connection, **kwargs):
+    """
+    Включает WAL для файловой SQLite: долгая читающая транзакция
+    выгрузки (см. api.exports) тогда не блокирует запись.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_WAL:
+        return
+    if connection.creation.is_in_memory_db(connection.settings_dict['NAME']):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
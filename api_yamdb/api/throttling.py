@@ -0,0 +1,181 @@
+"""
+Ограничение частоты запросов алгоритмом token bucket.
+
+Корзина вмещает num_requests жетонов и пополняется равномерно:
+num_requests за duration секунд. Запрос тратит жетон; пустая корзина
+отклоняет запрос с Retry-After до появления следующего жетона. В отличие
+от SimpleRateThrottle хранится не история запросов, а два числа.
+
+Корзины лежат в отдельной базе SQLite THROTTLE_DATABASE, общей для
+процессов на одной машине. Корзина читается и записывается в одной
+транзакции BEGIN IMMEDIATE, так что одновременные запросы из разных
+процессов не тратят один и тот же жетон. Корзины, которые успели бы
+наполниться, удаляются по индексу при каждом обращении.
+
+Корзины на IP-адрес строятся по get_ident DRF: при NUM_PROXIES = None
+это весь заголовок X-Forwarded-For, который клиент подделывает, чтобы
+получать новую корзину на каждый запрос. Поэтому NUM_PROXIES задан
+в настройках явно — числом прокси перед приложением.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from api.constants import THROTTLE_LOCK_TIMEOUT
+
+
+class BucketStore:
+    """Корзины в SQLite; соединение своё у каждого потока."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connect(self):
+        # Соединение, унаследованное при fork, не используется.
+        path = settings.THROTTLE_DATABASE
+        owner = (path, os.getpid())
+        if getattr(self._local, 'owner', None) != owner:
+            connection = sqlite3.connect(
+                path, timeout=THROTTLE_LOCK_TIMEOUT, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, '
+                'tokens REAL NOT NULL, updated_at REAL NOT NULL, '
+                'expires_at REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS bucket_expires_at '
+                'ON bucket (expires_at)'
+            )
+            self._local.connection = connection
+            self._local.owner = owner
+        return self._local.connection
+
+    def take(self, key, capacity, period):
+        """
+        Тратит жетон из корзины key. Возвращает None, если жетон был,
+        иначе — секунды до появления следующего.
+        """
+        connection = self.connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Время читается под блокировкой, иначе ожидание её
+            # освобождения засчиталось бы как пополнение.
+            now = time.time()
+            connection.execute(
+                'DELETE FROM bucket WHERE expires_at <= ?', (now,)
+            )
+            row = connection.execute(
+                'SELECT tokens, updated_at FROM bucket WHERE key = ?', (key,)
+            ).fetchone()
+            tokens, updated_at = row or (capacity, now)
+            tokens = min(
+                capacity,
+                tokens + max(0, now - updated_at) * capacity / period,
+            )
+            wait_time = None
+            if tokens < 1:
+                wait_time = (1 - tokens) * period / capacity
+            else:
+                # Пустая корзина наполняется за period секунд.
+                connection.execute(
+                    'INSERT INTO bucket (key, tokens, updated_at, '
+                    'expires_at) VALUES (?, ?, ?, ?) ON CONFLICT (key) '
+                    'DO UPDATE SET tokens = excluded.tokens, '
+                    'updated_at = excluded.updated_at, '
+                    'expires_at = excluded.expires_at',
+                    (key, tokens - 1, now, now + period),
+                )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return wait_time
+
+    def clear(self):
+        self.connect().execute('DELETE FROM bucket')
+
+
+buckets = BucketStore()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Базовый класс: подклассы задают scope и get_ident_key."""
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    # Методы, которые ограничиваются; None — все.
+    methods = None
+
+    def get_rate(self):
+        # Ставки читаются при каждом запросе, а не при импорте модуля.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        self.wait_time = buckets.take(key, self.num_requests, self.duration)
+        return self.wait_time is None
+
+    def wait(self):
+        return getattr(self, 'wait_time', None)
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Регистрация и получение токена: корзина на IP-адрес."""
+    scope = 'auth'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class ConfirmationCodeThrottle(TokenBucketThrottle):
+    """Подбор кода подтверждения: корзина на username с любых адресов."""
+    scope = 'confirmation_code'
+    methods = ('POST',)
+
+    def get_ident_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        return hashlib.sha256(username.encode()).hexdigest()
+
+
+class WriteUserThrottle(TokenBucketThrottle):
+    """Создание отзывов и комментариев: корзина на пользователя."""
+    scope = 'write'
+    methods = ('POST',)
+
+    def get_ident_key(self, request, view):
+        if request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class WriteIPThrottle(TokenBucketThrottle):
+    """Создание отзывов и комментариев: корзина на IP-адрес."""
+    scope = 'write_ip'
+    methods = ('POST',)
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (CategoryViewSet, CommentViewSet,
+from api.views import (CategoryViewSet, CommentViewSet, ExportView,
                        GenreViewSet, ReviewViewSet, TitleViewSet, MeView,
                        SignUpView, TokenObtainView, UserViewSet)
 
@@ -42,5 +42,6 @@ urlpatterns = [
     path('v1/auth/signup/', SignUpView.as_view(), name='signup'),
     path('v1/auth/token/', TokenObtainView.as_view(), name='token_obtain'),
     path('v1/users/me/', MeView.as_view(), name='me'),
+    path('v1/export/<str:resource>/', ExportView.as_view(), name='export'),
     path('v1/', include((api_v1_router.urls, 'api_v1'))),
 ]
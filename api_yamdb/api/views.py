@@ -1,26 +1,37 @@
-from django.db.models import Avg
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, generics, mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from api.cache import (CachedReadMixin, ConditionalGetMixin,
+                       review_comments, title_reviews)
+from api.exports import EXPORTS, CSVRenderer, NDJSONRenderer
 from api.filters import TitleFilter
-from api.paginations import ReviewPagination
+from api.paginations import PageNumberCursorPagination, ReviewPagination
 from api.permissions import (IsAdmin, IsAdminOrReadOnly,
                              IsAuthorAdminModerOrReadOnly)
 from api.serializers import (AdminUserSerializer, CategorySerializer,
                              CommentSerializer, GenreSerializer, MeSerializer,
                              ReviewSerializer, SignUpSerializer,
-                             TitleReadSerializer, TitleWriteSerializer,
-                             TokenSerializer)
+                             TitleReadSerializer, TitleRowSerializer,
+                             TitleWriteSerializer, TokenSerializer)
+from api.throttling import (AuthIPThrottle, ConfirmationCodeThrottle,
+                            WriteIPThrottle, WriteUserThrottle)
 from reviews.models import Category, Genre, Review, Title
 from users.models import User
 
 
 class GenreViewSet(
+    CachedReadMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -33,9 +44,12 @@ class GenreViewSet(
     pagination_class = ReviewPagination
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = "slug"
+    cursor_ordering = ("name", "id")
+    cache_resources = ("genres",)
 
 
 class CategoryViewSet(
+    CachedReadMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -48,57 +62,126 @@ class CategoryViewSet(
     pagination_class = ReviewPagination
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = "slug"
+    cursor_ordering = ("name", "id")
+    cache_resources = ("categories",)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.prefetch_related("genre", "category").annotate(
-        rating=Avg("reviews__score")
-    )
+class TitleViewSet(ConditionalGetMixin, CachedReadMixin,
+                   viewsets.ModelViewSet):
+    queryset = Title.objects.all()
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitleFilter
     permission_classes = [IsAdminOrReadOnly]
     pagination_class = ReviewPagination
+    cache_resources = ("titles", "genres", "categories")
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    @property
+    def cursor_ordering(self):
+        if self.action == "top":
+            return ("-weighted_rating", "id")
+        return ("name", "id")
+
+    @action(detail=False, methods=["get"])
+    def top(self, request):
+        """Лучшие произведения по байесовскому рейтингу.
+
+        Поддерживает те же фильтры, что и список (genre, category,
+        year, name); рейтинги заранее посчитаны и проиндексированы.
+        """
+        return self.list(request)
+
+    def create(self, request, *args, **kwargs):
+        """POST со списком создаёт произведения одним пакетом."""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def use_values_path(self):
+        return (self.action in ["list", "top"]
+                and settings.TITLE_LIST_VALUES_PATH)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "top":
+            queryset = queryset.top()
+        if self.use_values_path():
+            # Курсор берёт значения ключа сортировки из строк страницы.
+            fields = TitleRowSerializer.values_fields + tuple(
+                field.lstrip("-") for field in self.cursor_ordering
+                if field.lstrip("-") not in TitleRowSerializer.values_fields
+            )
+            return queryset.values(*fields)
+        return queryset
+
     def get_serializer_class(self):
-        if self.action in ["list", "retrieve"]:
+        if self.use_values_path():
+            return TitleRowSerializer
+        if self.action in ["list", "retrieve", "top"]:
             return TitleReadSerializer
         return TitleWriteSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Вьюсет для управления отзывами."""
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthorAdminModerOrReadOnly]
+    pagination_class = PageNumberCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
     http_method_names = ['get', 'post', 'patch', 'delete']
+    throttle_classes = [WriteUserThrottle, WriteIPThrottle]
+
+    def get_cache_resources(self):
+        return (title_reviews(self.kwargs['title_id']), 'authors')
 
     def get_title(self):
-        """Получает объект произведения."""
-        return get_object_or_404(Title, id=self.kwargs['title_id'])
+        """Получает объект произведения один раз за запрос."""
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title.objects.only('id'), id=self.kwargs['title_id']
+            )
+        return self._title
 
     def get_queryset(self):
         """Возвращает все отзывы для конкретного произведения."""
         title = self.get_title()
         return title.reviews.all()
 
+    def create(self, request, *args, **kwargs):
+        """Для несуществующего произведения отвечает 404 до валидации."""
+        self.get_title()
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Сохраняет новый отзыв с автором и привязывает его к произведению."""
         title = self.get_title()
         serializer.save(author=self.request.user, title=title)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Вьюсет для управления комментариями к отзывам."""
     serializer_class = CommentSerializer
     permission_classes = [IsAuthorAdminModerOrReadOnly]
+    pagination_class = PageNumberCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
     http_method_names = ['get', 'post', 'patch', 'delete']
+    throttle_classes = [WriteUserThrottle, WriteIPThrottle]
+
+    def get_cache_resources(self):
+        return (review_comments(self.kwargs['review_id']), 'authors')
 
     def get_review(self):
-        """Получает объект отзыва."""
-        return get_object_or_404(
-            Review, id=self.kwargs['review_id'],
-            title_id=self.kwargs.get('title_id')
-        )
+        """Получает объект отзыва один раз за запрос."""
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.only('id', 'title_id'),
+                id=self.kwargs['review_id'],
+                title_id=self.kwargs.get('title_id')
+            )
+        return self._review
 
     def get_queryset(self):
         """Возвращает все комментарии для конкретного отзыва."""
@@ -119,6 +202,7 @@ class SignUpView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = SignUpSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle]
 
     def create(self, request, *args, **kwargs):
         """Обрабатывает POST-запрос, создаёт пользователя, отправляет код."""
@@ -137,6 +221,7 @@ class TokenObtainView(APIView):
     Принимает username и confirmation_code, возвращает токен.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, ConfirmationCodeThrottle]
 
     def post(self, request):
         """Обрабатывает POST-запрос и возвращает JWT-токен."""
@@ -156,6 +241,8 @@ class UserViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ('username',)
     lookup_field = 'username'
+    pagination_class = PageNumberCursorPagination
+    cursor_ordering = ('username', 'id')
 
     def update(self, request, *args, **kwargs):
         """Запрещаем PUT-запросы (Method Not Allowed)."""
@@ -177,5 +264,59 @@ class MeView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        """Возвращает текущего аутентифицированного пользователя."""
-        return self.request.user
+        """
+        Возвращает текущего пользователя целиком: request.user несёт
+        только поля из токена (см. api.authentication).
+        """
+        return User.objects.get(pk=self.request.user.pk)
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка произведений, отзывов или комментариев.
+
+    Формат выбирается параметром format (ndjson по умолчанию или csv)
+    либо заголовком Accept. Параметр since (ISO 8601) оставляет
+    записи, опубликованные не раньше указанного момента; заголовок
+    X-Export-Snapshot подходит для следующей инкрементной выгрузки.
+    Доступна только администратору.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get_since(self, export):
+        value = self.request.query_params.get('since')
+        if value is None:
+            return None
+        if export.since_field is None:
+            raise ValidationError(
+                {'since': 'Фильтр недоступен для этой выгрузки.'}
+            )
+        try:
+            since = parse_datetime(value)
+        except ValueError:
+            since = None
+        if since is None:
+            raise ValidationError(
+                {'since': 'Ожидается дата и время в формате ISO 8601.'}
+            )
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        return since
+
+    def get(self, request, resource):
+        export = EXPORTS.get(resource)
+        if export is None:
+            raise NotFound()
+        since = self.get_since(export)
+        renderer = request.accepted_renderer
+        snapshot, content = export.open(renderer.format, since=since)
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{resource}.{renderer.format}"'
+        )
+        response['X-Export-Snapshot'] = snapshot.isoformat()
+        return response
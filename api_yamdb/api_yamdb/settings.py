@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -75,6 +76,10 @@ DATABASES = {
     }
 }
 
+# Журнал WAL для SQLite: запись не ждёт окончания потоковых выгрузок
+# (см. api.exports). Режим сохраняется в файле БД.
+SQLITE_WAL = True
+
 
 # Password validation
 
@@ -124,6 +129,60 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Письма ставятся в очередь users.OutboundEmail и отправляются командой
+# deliver_outbox; EMAIL_OUTBOX_EAGER отправляет их сразу, без воркера.
+EMAIL_OUTBOX_EAGER = False
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Задержка перед повтором в секундах, удваивается с каждой попыткой.
+EMAIL_OUTBOX_RETRY_DELAY = 60
+
+
+# Cache
+# Поколения и ответы должны лежать в кэше, общем для всех процессов
+# (включая management-команды), иначе запись в одном процессе не
+# инвалидирует ответы других. Файловый кэш общий в пределах машины;
+# для нескольких машин укажите memcached или redis.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Поколения ресурсов и закэшированные ответы (см. api.cache).
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(
+            tempfile.gettempdir(), 'api_yamdb_responses'
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+
+# Корзины ограничения частоты запросов, общие для процессов машины
+# (см. api.throttling).
+THROTTLE_DATABASE = os.path.join(
+    tempfile.gettempdir(), 'api_yamdb_throttle.sqlite3'
+)
+
+# Коды подтверждения (см. users.codes).
+CONFIRMATION_CODE_TIMEOUT = 60 * 60
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Список произведений собирается из .values() без экземпляров моделей.
+TITLE_LIST_VALUES_PATH = True
+
+
+# Leaderboard
+# Вес априорного среднего в байесовском рейтинге. Среднее по всем
+# отзывам и все рейтинги пересчитывает команда refresh_leaderboard
+# раз в LEADERBOARD_REFRESH_INTERVAL секунд; последнее среднее хранится
+# в общем кэше LEADERBOARD_CACHE_ALIAS.
+
+LEADERBOARD_PRIOR_WEIGHT = 10
+LEADERBOARD_REFRESH_INTERVAL = 60 * 60
+LEADERBOARD_CACHE_ALIAS = 'responses'
+
 
 # Authorization
 
@@ -136,9 +195,20 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.VersionedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # Число прокси перед приложением: IP клиента берётся из
+    # X-Forwarded-For с учётом только их адресов. 0 — только REMOTE_ADDR;
+    # None доверяет заголовку целиком, и его легко подделать.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
+    # Ёмкость корзины и время её полного пополнения (см. api.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': '30/min',
+        'confirmation_code': '5/min',
+        'write': '30/min',
+        'write_ip': '120/min',
+    },
 }
 
 SIMPLE_JWT = {
@@ -0,0 +1,735 @@
+"""
+Пакетный импорт CSV-выгрузок в БД.
+
+Строки файла читаются потоком (в том числе из .csv.gz), приводятся
+к типам полей модели и проверяются пачками: внешние ключи сверяются
+с заранее загруженными множествами id, а не запросом на строку.
+Валидаторы моделей, как и при прежнем построчном импорте,
+не применяются: данные выгрузки считаются доверенными.
+Каждая пачка записывается одним INSERT ... ON CONFLICT DO UPDATE
+в своей транзакции.
+"""
+import csv
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from reviews.models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 5000
+MANIFEST_NAME = ".import_manifest.json.gz"
+
+
+class CsvSpec:
+    """
+    Описание CSV-файла: модель и соответствие колонок её полям.
+
+    Если upsert выключен, уже существующие строки (по любому
+    уникальному ограничению) пропускаются, а колонка id не пишется.
+    """
+
+    def __init__(self, file, model, columns, upsert=True):
+        self.file = file
+        self.model = model
+        self.columns = columns
+        self.upsert = upsert
+
+    @property
+    def name(self):
+        return self.model._meta.object_name
+
+    def get_field(self, column):
+        return self.model._meta.get_field(self.columns[column])
+
+    def dependencies(self):
+        """Модели, на которые ссылаются колонки файла."""
+        return [
+            self.get_field(column).related_model
+            for column in self.columns
+            if self.get_field(column).is_relation
+        ]
+
+
+IMPORT_SPECS = [
+    CsvSpec("users.csv", User, {
+        "id": "id",
+        "username": "username",
+        "email": "email",
+        "role": "role",
+        "bio": "bio",
+        "first_name": "first_name",
+        "last_name": "last_name",
+    }),
+    CsvSpec("category.csv", Category, {
+        "id": "id", "name": "name", "slug": "slug",
+    }),
+    CsvSpec("genre.csv", Genre, {
+        "id": "id", "name": "name", "slug": "slug",
+    }),
+    CsvSpec("titles.csv", Title, {
+        "id": "id",
+        "name": "name",
+        "year": "year",
+        "description": "description",
+        "category": "category",
+    }),
+    CsvSpec("genre_title.csv", Title.genre.through, {
+        "title_id": "title", "genre_id": "genre",
+    }, upsert=False),
+    CsvSpec("review.csv", Review, {
+        "id": "id",
+        "title_id": "title",
+        "text": "text",
+        "author": "author",
+        "score": "score",
+        "pub_date": "pub_date",
+    }),
+    CsvSpec("comments.csv", Comment, {
+        "id": "id",
+        "review_id": "review",
+        "text": "text",
+        "author": "author",
+        "pub_date": "pub_date",
+    }),
+]
+
+
+def shard_name(filename, number, compress=False):
+    """Имя части файла: review.csv -> review.00001.csv(.gz)."""
+    stem, extension = os.path.splitext(filename)
+    name = f"{stem}.{number:05d}{extension}"
+    return f"{name}.gz" if compress else name
+
+
+def find_csv_files(path, filename):
+    """
+    Файлы с данными для filename в каталоге path: сам файл, его
+    .gz-версия и части вида review.00001.csv(.gz) по порядку.
+    """
+    stem, extension = os.path.splitext(filename)
+    shards = re.compile(
+        rf"{re.escape(stem)}\.\d+{re.escape(extension)}(\.gz)?"
+    )
+    names = sorted(os.listdir(path))
+    return [
+        os.path.join(path, name) for name in names
+        if name in (filename, f"{filename}.gz") or shards.fullmatch(name)
+    ]
+
+
+def export_columns(spec):
+    """Колонки файла при выгрузке: id всегда первым, как в static/data."""
+    columns = list(spec.columns)
+    if "id" not in columns:
+        columns.insert(0, "id")
+    return columns
+
+
+def open_csv(file_path):
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rt", encoding="utf-8", newline="")
+    return open(file_path, encoding="utf-8", newline="")
+
+
+def csv_value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class ShardWriter:
+    """
+    CSV-файл выгрузки, который при заданном размере части
+    продолжается в следующем файле review.00002.csv и т. д.
+    """
+
+    def __init__(self, path, filename, header, compress=False,
+                 shard_size=None):
+        self.path = path
+        self.filename = filename
+        self.header = header
+        self.compress = compress
+        self.shard_size = shard_size
+        self.files = []
+        self.file = None
+        self.rows_in_file = 0
+
+    def clear(self):
+        """Удаляет прежние файлы и части, иначе import_csv прочтёт их."""
+        for file_path in find_csv_files(self.path, self.filename):
+            os.remove(file_path)
+
+    def open_next(self):
+        self.close()
+        if self.shard_size:
+            name = shard_name(
+                self.filename, len(self.files) + 1, self.compress
+            )
+        else:
+            name = f"{self.filename}.gz" if self.compress else self.filename
+        file_path = os.path.join(self.path, name)
+        if self.compress:
+            self.file = gzip.open(
+                file_path, "wt", encoding="utf-8", newline=""
+            )
+        else:
+            self.file = open(file_path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.header)
+        self.files.append(file_path)
+        self.rows_in_file = 0
+
+    def writerow(self, row):
+        if self.file is None or (
+            self.shard_size and self.rows_in_file >= self.shard_size
+        ):
+            self.open_next()
+        self.writer.writerow([csv_value(value) for value in row])
+        self.rows_in_file += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class RowError(Exception):
+    """Строка файла не прошла проверку; number — номер записи с 1."""
+
+    def __init__(self, number, row, message):
+        super().__init__(f"row {number}: {message}")
+        self.number = number
+        self.row = row
+        self.message = message
+
+    def __reduce__(self):
+        # Ошибки возвращаются из рабочих процессов пула.
+        return type(self), (self.number, self.row, self.message)
+
+
+def get_spec(file):
+    for spec in IMPORT_SPECS:
+        if spec.file == file:
+            return spec
+    raise KeyError(file)
+
+
+def import_levels(specs):
+    """
+    Уровни графа зависимостей по внешним ключам.
+
+    Файлы одного уровня ссылаются только на модели предыдущих
+    уровней или на модели, которых нет среди импортируемых.
+    """
+    models = {spec.model for spec in specs}
+    done = set()
+    remaining = list(specs)
+    levels = []
+    while remaining:
+        level = [
+            spec for spec in remaining
+            if all(
+                dependency in done or dependency not in models
+                or dependency is spec.model
+                for dependency in spec.dependencies()
+            )
+        ]
+        if not level:
+            raise ValueError(
+                "Circular foreign keys between "
+                + ", ".join(spec.file for spec in remaining)
+            )
+        levels.append(level)
+        done.update(spec.model for spec in level)
+        remaining = [spec for spec in remaining if spec not in level]
+    return levels
+
+
+def convert_row(spec, number, row):
+    """Приводит значения строки к типам полей, не обращаясь к БД."""
+    values = {}
+    for column in spec.columns:
+        if column not in row:
+            continue
+        field = spec.get_field(column)
+        raw = row[column]
+        if raw in ("", None) and field.null:
+            values[field.attname] = None
+            continue
+        python_field = field.target_field if field.is_relation else field
+        try:
+            values[field.attname] = python_field.to_python(raw)
+        except ValidationError as error:
+            raise RowError(
+                number, row, f"{column}: {'; '.join(error.messages)}"
+            )
+    if spec.upsert and spec.model._meta.pk.attname not in values:
+        raise RowError(number, row, "id is required")
+    return values
+
+
+def row_digest(spec, row):
+    """Короткий хэш содержимого строки файла по колонкам описания."""
+    content = json.dumps([row.get(column) for column in spec.columns])
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+
+def row_key(spec, values):
+    """Ключ строки в манифесте: id или, без upsert, значения колонок."""
+    if spec.upsert:
+        return str(values[spec.model._meta.pk.attname])
+    return ":".join(
+        str(values.get(spec.get_field(column).attname))
+        for column in spec.columns
+    )
+
+
+def parse_chunk(file, rows, start, digests=False):
+    """
+    Разбирает пачку строк файла; выполняется в рабочем процессе.
+
+    Возвращает пары (номер записи, значения), ошибки, время разбора
+    и, если нужно, хэши исходных строк в порядке пар.
+    """
+    started = time.monotonic()
+    spec = get_spec(file)
+    parsed = []
+    errors = []
+    hashes = []
+    for number, row in enumerate(rows, start):
+        try:
+            parsed.append((number, convert_row(spec, number, row)))
+        except RowError as error:
+            errors.append(error)
+            continue
+        if digests:
+            hashes.append(row_digest(spec, row))
+    return parsed, errors, time.monotonic() - started, hashes
+
+
+def read_chunks(file_path, batch_size):
+    """Пачки сырых строк файла с номером первой записи."""
+    with open_csv(file_path) as csvfile:
+        reader = csv.DictReader(csvfile)
+        number = 1
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                break
+            yield number, rows
+            number += len(rows)
+
+
+def init_worker():
+    """Настраивает Django в процессе пула, запущенном не через fork."""
+    if not apps.ready:
+        django.setup()
+
+
+class SerialExecutor(Executor):
+    """Выполняет задачи сразу в текущем процессе."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+
+def get_executor(workers):
+    if workers > 1:
+        return ProcessPoolExecutor(workers, initializer=init_worker)
+    return SerialExecutor()
+
+
+class IdMap:
+    """Множества существующих id по моделям, загружаемые один раз."""
+
+    def __init__(self, using):
+        self.using = using
+        self._ids = {}
+
+    def get(self, model):
+        if model not in self._ids:
+            self._ids[model] = set(
+                model._default_manager.using(self.using).values_list(
+                    "pk", flat=True
+                )
+            )
+        return self._ids[model]
+
+    def add(self, model, ids):
+        if model in self._ids:
+            self._ids[model].update(ids)
+
+
+class Importer:
+    """Запись одного файла по описанию CsvSpec."""
+
+    def __init__(self, spec, id_map=None, on_write=None):
+        self.spec = spec
+        self.on_write = on_write
+        self.model = spec.model
+        self.using = router.db_for_write(self.model)
+        self.connection = connections[self.using]
+        if self.connection.vendor not in ("sqlite", "postgresql"):
+            raise NotImplementedError(
+                "Batched import needs INSERT ... ON CONFLICT "
+                "(SQLite or PostgreSQL)."
+            )
+        self.id_map = id_map or IdMap(self.using)
+        # В INSERT идут все поля: отсутствующие в файле получают
+        # значения по умолчанию, но при конфликте не перезаписываются.
+        self.fields = [
+            field for field in self.model._meta.concrete_fields
+            if spec.upsert or not field.primary_key
+        ]
+        self.relations = [
+            (column, spec.get_field(column)) for column in spec.columns
+            if spec.get_field(column).is_relation
+        ]
+
+    def check_relations(self, parsed):
+        """Отсеивает строки со ссылками на несуществующие объекты."""
+        relations = [
+            (column, field, self.id_map.get(field.related_model))
+            for column, field in self.relations
+        ]
+        valid = []
+        errors = []
+        for number, values in parsed:
+            for column, field, ids in relations:
+                value = values.get(field.attname)
+                if value is not None and value not in ids:
+                    errors.append(RowError(number, values, (
+                        f"{column}: {field.related_model._meta.object_name}"
+                        f" {value} does not exist"
+                    )))
+                    break
+            else:
+                valid.append((number, values))
+        return valid, errors
+
+    def insert_values(self, values):
+        """Значения для всех колонок INSERT, недостающие — по умолчанию."""
+        now = timezone.now()
+        result = []
+        for field in self.fields:
+            if field.attname in values:
+                value = values[field.attname]
+            elif getattr(field, "auto_now", False) or getattr(
+                field, "auto_now_add", False
+            ):
+                value = now
+            else:
+                value = field.get_default()
+            result.append(
+                field.get_db_prep_save(value, connection=self.connection)
+            )
+        return result
+
+    def get_sql(self, updated):
+        quote = self.connection.ops.quote_name
+        columns = ", ".join(quote(field.column) for field in self.fields)
+        placeholders = ", ".join(["%s"] * len(self.fields))
+        sql = (
+            f"INSERT INTO {quote(self.model._meta.db_table)} "
+            f"({columns}) VALUES ({placeholders}) "
+        )
+        if not self.spec.upsert:
+            return sql + "ON CONFLICT DO NOTHING"
+        pk = self.model._meta.pk
+        assignments = ", ".join(
+            f"{quote(field.column)} = excluded.{quote(field.column)}"
+            for field in self.fields
+            if field.attname in updated and not field.primary_key
+        )
+        if not assignments:
+            return sql + f"ON CONFLICT ({quote(pk.column)}) DO NOTHING"
+        return sql + (
+            f"ON CONFLICT ({quote(pk.column)}) DO UPDATE SET {assignments}"
+        )
+
+    def write(self, batch):
+        """
+        Записывает пары (номер записи, значения) одним executemany
+        в своей транзакции; возвращает записанные значения и ошибки.
+
+        Если пачка нарушает другое уникальное ограничение (например,
+        username), строки пишутся по одной, а ошибочные возвращаются.
+        """
+        if not batch:
+            return [], []
+        rows = [values for _, values in batch]
+        updated = set().union(*(values.keys() for values in rows))
+        sql = self.get_sql(updated)
+        try:
+            with transaction.atomic(using=self.using):
+                with self.connection.cursor() as cursor:
+                    cursor.executemany(
+                        sql, [self.insert_values(values) for values in rows]
+                    )
+                self.after_write(rows)
+            return rows, []
+        except IntegrityError:
+            pass
+        written = []
+        failed = []
+        with transaction.atomic(using=self.using):
+            for number, values in batch:
+                try:
+                    with transaction.atomic(using=self.using):
+                        with self.connection.cursor() as cursor:
+                            cursor.execute(sql, self.insert_values(values))
+                    written.append(values)
+                except IntegrityError as error:
+                    failed.append(RowError(number, values, str(error)))
+            self.after_write(written)
+        return written, failed
+
+    def after_write(self, batch):
+        """Вызывается внутри транзакции пачки после записи."""
+        pk = self.model._meta.pk.attname
+        self.id_map.add(
+            self.model, (values[pk] for values in batch if pk in values)
+        )
+        if self.on_write is not None and batch:
+            self.on_write(self.spec, batch)
+
+    def delete(self, keys, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Удаляет строки по ключам манифеста через ORM, чтобы сработали
+        каскады и сигналы (рейтинги, кэш ответов); возвращает число.
+        """
+        keys = iter(keys)
+        deleted = 0
+        while True:
+            chunk = list(islice(keys, batch_size))
+            if not chunk:
+                return deleted
+            with transaction.atomic(using=self.using):
+                deleted += self.model._default_manager.using(
+                    self.using
+                ).filter(self.key_filter(chunk)).delete()[1].get(
+                    self.model._meta.label, 0
+                )
+
+    def key_filter(self, keys):
+        if self.spec.upsert:
+            pk = self.model._meta.pk
+            return Q(pk__in=[pk.to_python(key) for key in keys])
+        fields = [self.spec.get_field(column) for column in self.spec.columns]
+        condition = Q()
+        for key in keys:
+            condition |= Q(**{
+                field.attname: field.target_field.to_python(value)
+                for field, value in zip(fields, key.split(":"))
+            })
+        return condition
+
+    def existing_keys(self):
+        """Ключи всех строк таблицы в формате манифеста."""
+        attnames = [
+            self.spec.get_field(column).attname
+            for column in self.spec.columns
+        ]
+        if self.spec.upsert:
+            attnames = [self.model._meta.pk.attname]
+        rows = self.model._default_manager.using(self.using).values_list(
+            *attnames
+        )
+        return {":".join(str(value) for value in row) for row in rows}
+
+    def reset_sequences(self):
+        """После вставки явных id сдвигает последовательности (PostgreSQL)."""
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), [self.model]
+        )
+        if statements:
+            with self.connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+class ImportManifest:
+    """
+    Хэши строк последнего импорта по моделям: {label: {ключ: хэш}}.
+
+    Строка с тем же хэшем считается неизменной и не пишется. В
+    манифест попадают только записанные строки, поэтому отклонённые
+    будут повторены при следующем импорте. Изменения, сделанные в БД
+    в обход импорта, манифест не замечает.
+    """
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") == self.version:
+                self.entries = data["models"]
+        self.seen = defaultdict(set)
+        self.pending = defaultdict(dict)
+
+    def get(self, spec):
+        return self.entries.setdefault(spec.model._meta.label, {})
+
+    def changed(self, spec, parsed, digests):
+        """Оставляет строки, которых нет в манифесте или чей хэш другой."""
+        entries = self.get(spec)
+        seen = self.seen[spec]
+        pending = self.pending[spec]
+        result = []
+        for (number, values), digest in zip(parsed, digests):
+            key = row_key(spec, values)
+            seen.add(key)
+            if entries.get(key) != digest:
+                pending[key] = digest
+                result.append((number, values))
+        return result
+
+    def commit(self, spec, written):
+        """Запоминает хэши записанных строк."""
+        entries = self.get(spec)
+        pending = self.pending[spec]
+        for values in written:
+            key = row_key(spec, values)
+            entries[key] = pending.pop(key)
+        pending.clear()
+
+    def missing(self, spec):
+        """Ключи из манифеста, которых не было в файле."""
+        return set(self.get(spec)) - self.seen[spec]
+
+    def forget(self, spec, keys):
+        entries = self.get(spec)
+        for key in keys:
+            entries.pop(key, None)
+
+    def retain(self, spec, keys):
+        """Оставляет только ключи существующих строк (после каскадов)."""
+        entries = self.get(spec)
+        self.forget(spec, set(entries) - keys)
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(
+            dir=directory, suffix=".tmp", delete=False
+        ) as raw:
+            with gzip.open(raw, "wt", encoding="utf-8") as file:
+                json.dump(
+                    {"version": self.version, "models": self.entries}, file
+                )
+        os.replace(raw.name, self.path)
+
+
+class ImportPipeline:
+    """
+    Разбор файлов в пуле процессов и единственный упорядоченный писатель.
+
+    Пачки уходят на разбор в порядке уровней графа зависимостей, не
+    дожидаясь записи предыдущих файлов, но в работе одновременно не
+    больше window пачек. Писатель забирает результаты в том же порядке,
+    сверяет внешние ключи с id уже записанных строк и пишет пачку,
+    поэтому к записи отзывов все произведения уже сохранены.
+    """
+    STAGES = ("read", "parse", "wait", "diff", "check", "write")
+
+    def __init__(self, jobs, importers, workers=1,
+                 batch_size=DEFAULT_BATCH_SIZE, window=None, manifest=None):
+        self.jobs = jobs
+        self.importers = importers
+        self.workers = workers
+        self.batch_size = batch_size
+        self.window = window or max(2, workers * 2)
+        self.manifest = manifest
+        self.timings = {spec: defaultdict(float) for spec, _ in jobs}
+        self.unchanged = defaultdict(int)
+
+    def elapsed(self, spec):
+        """Время писателя на файл; разбор в пуле идёт параллельно с ним."""
+        timings = self.timings[spec]
+        return sum(
+            timings[stage] for stage in self.STAGES
+            if stage != "parse" or self.workers == 1
+        )
+
+    def chunks(self):
+        for spec, file_paths in self.jobs:
+            for file_path in file_paths:
+                chunks = read_chunks(file_path, self.batch_size)
+                while True:
+                    started = time.monotonic()
+                    chunk = next(chunks, None)
+                    self.timings[spec]["read"] += time.monotonic() - started
+                    if chunk is None:
+                        break
+                    yield spec, chunk
+
+    def run(self):
+        """Импортирует файлы, отдавая (spec, записано, ошибки) по пачкам."""
+        chunks = self.chunks()
+        pending = deque()
+        with get_executor(self.workers) as executor:
+            while True:
+                while len(pending) < self.window:
+                    item = next(chunks, None)
+                    if item is None:
+                        break
+                    spec, (start, rows) = item
+                    pending.append((spec, executor.submit(
+                        parse_chunk, spec.file, rows, start,
+                        digests=self.manifest is not None
+                    )))
+                if not pending:
+                    break
+                spec, future = pending.popleft()
+                yield (spec, *self.write(spec, future))
+
+    def write(self, spec, future):
+        timings = self.timings[spec]
+        importer = self.importers[spec]
+        started = time.monotonic()
+        parsed, errors, parse_time, digests = future.result()
+        diffed = time.monotonic()
+        if self.manifest is not None:
+            changed = self.manifest.changed(spec, parsed, digests)
+            self.unchanged[spec] += len(parsed) - len(changed)
+            parsed = changed
+        checked = time.monotonic()
+        valid, invalid = importer.check_relations(parsed)
+        written_at = time.monotonic()
+        written, rejected = importer.write(valid)
+        if self.manifest is not None:
+            self.manifest.commit(spec, written)
+        finished = time.monotonic()
+        timings["parse"] += parse_time
+        timings["wait"] += diffed - started
+        timings["diff"] += checked - diffed
+        timings["check"] += written_at - checked
+        timings["write"] += finished - written_at
+        return written, errors + invalid + rejected
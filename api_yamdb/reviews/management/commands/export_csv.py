@@ -0,0 +1,100 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+
+from reviews.importing import (DEFAULT_BATCH_SIZE, IMPORT_SPECS,
+                               ShardWriter, export_columns)
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает данные из БД в CSV файлы в формате, "
+        "который читает import_csv."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            type=str,
+            required=True,
+            help="Directory to write CSV files to.",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Compress files (name.csv.gz).",
+        )
+        parser.add_argument(
+            "--shard-size",
+            type=int,
+            default=None,
+            help="Maximum rows per file; splits into name.00001.csv, ...",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows fetched from the database per round trip.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if options["shard_size"] is not None and options["shard_size"] <= 0:
+            raise CommandError("--shard-size must be positive.")
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size must be positive.")
+        os.makedirs(path, exist_ok=True)
+
+        started = time.monotonic()
+        # Все файлы читаются в одной транзакции из одного снимка БД,
+        # поэтому ссылки между ними согласованы.
+        with transaction.atomic(using=router.db_for_read(
+            IMPORT_SPECS[0].model
+        )):
+            for spec in IMPORT_SPECS:
+                self.export(spec, path, options)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Export finished in {time.monotonic() - started:.2f}s."
+            )
+        )
+
+    def export(self, spec, path, options):
+        """Потоково пишет таблицу модели в файл(ы) описания spec."""
+        columns = export_columns(spec)
+        attnames = [
+            spec.model._meta.get_field(
+                spec.columns.get(column, column)
+            ).attname
+            for column in columns
+        ]
+        rows = spec.model._default_manager.order_by("pk").values_list(
+            *attnames
+        ).iterator(chunk_size=options["chunk_size"])
+
+        started = time.monotonic()
+        writer = ShardWriter(
+            path, spec.file, columns, compress=options["gzip"],
+            shard_size=options["shard_size"],
+        )
+        writer.clear()
+        count = 0
+        try:
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+            if not writer.files:
+                writer.open_next()
+        finally:
+            writer.close()
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {count} rows from {spec.name} to "
+                f"{len(writer.files)} file(s) in {elapsed:.2f}s "
+                f"({rate:.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,146 @@
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import bump_generation
+from reviews.importing import (DEFAULT_BATCH_SIZE, IMPORT_SPECS, Importer,
+                               ShardWriter, export_columns)
+from reviews.models import Title
+from reviews.search import rebuild_search_index
+from reviews.synthetic import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует воспроизводимый синтетический набор данных "
+        "в CSV для import_csv или сразу в БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        for name, default in (("users", 1000), ("categories", 8),
+                              ("genres", 30), ("titles", 10000),
+                              ("reviews", 100000), ("comments", 10000)):
+            parser.add_argument(
+                f"--{name}", type=int, default=default,
+                help=f"Number of {name} (default {default}).",
+            )
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of title, category and genre popularity.",
+        )
+        parser.add_argument(
+            "--output",
+            choices=("csv", "db"),
+            default="csv",
+            help="Write CSV files to --path or insert into the database.",
+        )
+        parser.add_argument("--path", type=str, default=None)
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--shard-size", type=int, default=None)
+        parser.add_argument(
+            "--batch-size", type=int, default=DEFAULT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name] for name in (
+                "users", "categories", "genres", "titles", "reviews",
+                "comments",
+            )
+        }
+        if any(count < 0 for count in counts.values()):
+            raise CommandError("Counts must not be negative.")
+        if counts["reviews"] > counts["titles"] * counts["users"]:
+            raise CommandError(
+                "--reviews must not exceed --titles * --users: "
+                "each user reviews a title at most once."
+            )
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive.")
+        if options["output"] == "csv" and not options["path"]:
+            raise CommandError("--path is required for --output csv.")
+        generator = DatasetGenerator(
+            seed=options["seed"], zipf_exponent=options["zipf"], **counts
+        )
+
+        started = time.monotonic()
+        if options["output"] == "csv":
+            os.makedirs(options["path"], exist_ok=True)
+            write = self.write_csv
+        else:
+            self.check_empty()
+            write = self.write_db
+        for spec in IMPORT_SPECS:
+            table_started = time.monotonic()
+            count = write(spec, generator.rows(spec), options)
+            elapsed = time.monotonic() - table_started
+            rate = count / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"Generated {count} rows for {spec.file} in {elapsed:.2f}s "
+                f"({rate:.0f} rows/s)."
+            ))
+        if options["output"] == "db":
+            self.finish_db()
+        self.stdout.write(self.style.SUCCESS(
+            f"Dataset generated in {time.monotonic() - started:.2f}s."
+        ))
+
+    def write_csv(self, spec, rows, options):
+        columns = export_columns(spec)
+        attnames = [
+            spec.get_field(column).attname if column in spec.columns
+            else None
+            for column in columns
+        ]
+        writer = ShardWriter(
+            options["path"], spec.file, columns, compress=options["gzip"],
+            shard_size=options["shard_size"],
+        )
+        writer.clear()
+        count = 0
+        try:
+            for count, values in enumerate(rows, 1):
+                # Колонка без поля — собственный id строки связи.
+                writer.writerow([
+                    values[attname] if attname else count
+                    for attname in attnames
+                ])
+            if not writer.files:
+                writer.open_next()
+        finally:
+            writer.close()
+        return count
+
+    def check_empty(self):
+        for spec in IMPORT_SPECS:
+            if spec.model._default_manager.exists():
+                raise CommandError(
+                    f"Table of {spec.name} is not empty; "
+                    "--output db needs an empty database."
+                )
+
+    def write_db(self, spec, rows, options):
+        """Пишет строки тем же пакетным upsert, что и import_csv."""
+        importer = Importer(spec)
+        count = 0
+        while True:
+            batch = list(islice(rows, options["batch_size"]))
+            if not batch:
+                break
+            written, failed = importer.write(list(enumerate(batch, count)))
+            if failed:
+                raise CommandError(f"{spec.file}: {failed[0]}")
+            count += len(written)
+        importer.reset_sequences()
+        return count
+
+    def finish_db(self):
+        Title.objects.recalculate_ratings()
+        Title.objects.refresh_weighted_ratings()
+        rebuild_search_index(Title)
+        bump_generation("titles", "genres", "categories", "authors")
@@ -1,22 +1,50 @@
-import csv
 import os
+import time
 
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
 
+from api.cache import (bump_generation, review_comments, title_reviews,
+                       user_auth)
+from reviews.importing import (DEFAULT_BATCH_SIZE, IMPORT_SPECS,
+                               MANIFEST_NAME, ImportManifest, ImportPipeline,
+                               Importer, find_csv_files,
+                               import_levels)
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.search import index_titles, rebuild_search_index
 
 User = get_user_model()
 
-IMPORT_CONFIG = [
-    {"file": "users.csv", "model": User},
-    {"file": "category.csv", "model": Category},
-    {"file": "genre.csv", "model": Genre},
-    {"file": "titles.csv", "model": Title},
-    {"file": "genre_title.csv", "model": None},
-    {"file": "review.csv", "model": Review},
-    {"file": "comments.csv", "model": Comment},
-]
+# Больше затронутых произведений пересчитываются целиком, а не по id.
+PARTIAL_REFRESH_LIMIT = 10000
+
+
+def invalidate_cache(spec, batch):
+    """Инвалидирует закэшированные ответы, затронутые пачкой."""
+    model = spec.model
+    if model is User:
+        # Пакетная запись обходит сигналы, поэтому версии пользователей
+        # увеличиваются здесь: выданные токены перепроверяются по БД.
+        resources = ["authors"] + [
+            user_auth(values["id"]) for values in batch
+        ]
+    elif model is Category:
+        resources = ["categories", "titles"]
+    elif model is Genre:
+        resources = ["genres", "titles"]
+    elif model is Review:
+        resources = ["titles"] + [
+            title_reviews(title_id)
+            for title_id in {values["title_id"] for values in batch}
+        ]
+    elif model is Comment:
+        resources = [
+            review_comments(review_id)
+            for review_id in {values["review_id"] for values in batch}
+        ]
+    else:
+        resources = ["titles"]
+    bump_generation(*resources)
 
 
 class Command(BaseCommand):
@@ -27,7 +55,36 @@ class Command(BaseCommand):
             "--path",
             type=str,
             default="static/data/",
-            help="Directory path containing CSV files.",
+            help="Directory path containing CSV (.csv, .csv.gz or "
+                 "sharded name.00001.csv) files.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows per INSERT batch and transaction.",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Skip rows whose content hash matches the manifest.",
+        )
+        parser.add_argument(
+            "--manifest",
+            type=str,
+            default=None,
+            help=f"Manifest file (default: <path>/{MANIFEST_NAME}).",
+        )
+        parser.add_argument(
+            "--delete-missing",
+            action="store_true",
+            help="With --incremental, delete rows missing from the files.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes parsing CSV files; 1 parses in-process.",
         )
 
     def handle(self, *args, **options):
@@ -35,85 +92,178 @@ class Command(BaseCommand):
 
         if not os.path.exists(path):
             raise CommandError(f"The directory {path} does not exist.")
+        if options["batch_size"] <= 0 or options["workers"] <= 0:
+            raise CommandError("--batch-size and --workers must be positive.")
+        if options["delete_missing"] and not options["incremental"]:
+            raise CommandError("--delete-missing requires --incremental.")
 
-        for config in IMPORT_CONFIG:
-            filename = config["file"]
-            model = config["model"]
-            file_path = os.path.join(path, filename)
+        started = time.monotonic()
+        manifest = None
+        if options["incremental"]:
+            manifest = ImportManifest(
+                options["manifest"] or os.path.join(path, MANIFEST_NAME)
+            )
+        jobs = self.get_jobs(path)
+        importers = self.get_importers(jobs)
+        pipeline = ImportPipeline(
+            jobs, importers, workers=options["workers"],
+            batch_size=options["batch_size"], manifest=manifest,
+        )
+        imported, touched_titles = self.run_pipeline(pipeline)
+        for spec, _ in jobs:
+            importers[spec].reset_sequences()
+            self.report(spec, imported[spec], pipeline)
 
-            if not os.path.exists(file_path):
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"File {filename} not found. Skipping..."
-                    )
+        if manifest is not None:
+            if options["delete_missing"]:
+                self.delete_missing(jobs, importers, manifest)
+            manifest.save()
+        if any(imported[spec]["written"] for spec in imported):
+            self.finish_import(
+                {spec.model: count["written"]
+                 for spec, count in imported.items()},
+                touched_titles if manifest is not None else None
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import finished in {time.monotonic() - started:.2f}s."
+            )
+        )
+
+    def get_importers(self, jobs):
+        id_map = None
+        importers = {}
+        for spec, _ in jobs:
+            try:
+                importers[spec] = Importer(
+                    spec, id_map=id_map, on_write=invalidate_cache
                 )
-                continue
+            except NotImplementedError as error:
+                raise CommandError(str(error))
+            id_map = importers[spec].id_map
+        return importers
 
-            if filename == "genre_title.csv":
+    def run_pipeline(self, pipeline):
+        """Печатает ошибки строк; возвращает счётчики и id произведений."""
+        imported = {
+            spec: {"written": 0, "failed": 0} for spec, _ in pipeline.jobs
+        }
+        touched_titles = set()
+        for spec, written, errors in pipeline.run():
+            for error in errors:
                 self.stdout.write(
-                    self.style.SUCCESS(f"Importing data from {filename}...")
+                    self.style.ERROR(
+                        f"Error importing row {error.row}: {error}"
+                    )
                 )
-                self.import_genre_title(file_path)
-            else:
-                self.stdout.write(
-                    self.style.SUCCESS(f"Importing data from {filename}...")
+            imported[spec]["written"] += len(written)
+            imported[spec]["failed"] += len(errors)
+            if spec.model is Title:
+                touched_titles.update(values["id"] for values in written)
+            elif spec.model is Review:
+                touched_titles.update(
+                    values["title_id"] for values in written
                 )
-                self.import_csv(file_path, model)
-
-    def import_csv(self, file_path, model):
-        with open(file_path, encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            count = 0
-            for row in reader:
-                try:
-                    # Обрабатываем FK
-                    if model == Title and "category" in row:
-                        category_id = row.pop("category")
-                        row["category"] = Category.objects.get(id=category_id)
-
-                    if model == Review and "author" in row:
-                        user_id = row.pop("author")
-                        row["author"] = User.objects.get(id=user_id)
-
-                    if model == Review and "title" in row:
-                        title_id = row.pop("title")
-                        row["title"] = Title.objects.get(id=title_id)
-
-                    if model == Comment and "author" in row:
-                        user_id = row.pop("author")
-                        row["author"] = User.objects.get(id=user_id)
-
-                    if model == Comment and "review" in row:
-                        review_id = row.pop("review")
-                        row["review"] = Review.objects.get(id=review_id)
-
-                    model.objects.update_or_create(**row)
-                    count += 1
-                except Exception as e:
+        return imported, touched_titles
+
+    def delete_missing(self, jobs, importers, manifest):
+        """
+        Удаляет строки, пропавшие из файлов, в обратном порядке
+        зависимостей; каскады затем вычищаются из манифеста.
+        """
+        deleted_any = False
+        for spec, _ in reversed(jobs):
+            keys = manifest.missing(spec)
+            if not keys:
+                continue
+            deleted = importers[spec].delete(keys)
+            manifest.forget(spec, keys)
+            deleted_any = deleted_any or bool(deleted)
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {deleted} rows missing from {spec.file}."
+            ))
+        if deleted_any:
+            for spec, _ in jobs:
+                manifest.retain(spec, importers[spec].existing_keys())
+
+    def get_jobs(self, path):
+        """Найденные файлы в порядке уровней графа зависимостей."""
+        jobs = []
+        for number, level in enumerate(import_levels(IMPORT_SPECS), 1):
+            found = []
+            for spec in level:
+                file_paths = find_csv_files(path, spec.file)
+                if not file_paths:
                     self.stdout.write(
-                        self.style.ERROR(f"Error importing row {row}: {e}")
+                        self.style.WARNING(
+                            f"File {spec.file} not found. Skipping..."
+                        )
                     )
+                    continue
+                found.append((spec, file_paths))
+            if found:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Stage {number}: importing data from "
+                    + ", ".join(
+                        os.path.basename(file_paths[0])
+                        if len(file_paths) == 1
+                        else f"{spec.file} ({len(file_paths)} shards)"
+                        for spec, file_paths in found
+                    )
+                    + "..."
+                ))
+            jobs.extend(found)
+        return jobs
 
+    def report(self, spec, count, pipeline):
+        """Итог по файлу: строки, скорость и время по этапам."""
+        timings = pipeline.timings[spec]
+        elapsed = pipeline.elapsed(spec)
+        rate = count["written"] / elapsed if elapsed else 0
+        stages = ", ".join(
+            f"{stage} {timings[stage]:.2f}s"
+            for stage in ImportPipeline.STAGES
+        )
+        message = (
+            f"Successfully imported {count['written']} rows into "
+            f"{spec.name} in {elapsed:.2f}s ({rate:.0f} rows/s; {stages})."
+        )
+        if spec in pipeline.unchanged:
+            message += f" {pipeline.unchanged[spec]} rows unchanged."
+        if count["failed"]:
+            message += f" {count['failed']} rows failed."
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def finish_import(self, imported, touched_titles=None):
+        """
+        Пакетная запись обходит сигналы моделей, поэтому рейтинги
+        и поисковый индекс пересчитываются один раз после импорта:
+        целиком или, при инкрементальном импорте, только для
+        затронутых произведений.
+        """
+        if touched_titles is not None and (
+            len(touched_titles) > PARTIAL_REFRESH_LIMIT
+        ):
+            touched_titles = None
+        titles = Title.objects.all()
+        if touched_titles is not None:
+            titles = titles.filter(pk__in=touched_titles)
+        if imported.get(Title) or imported.get(Review):
+            updated = titles.recalculate_ratings()
+            if touched_titles is None:
+                # Полный импорт меняет и среднее C; инкрементальный
+                # обновляет только затронутые произведения, а среднее
+                # пересчитает refresh_leaderboard.
+                Title.objects.refresh_weighted_ratings()
+            bump_generation("titles")
+            self.stdout.write(self.style.SUCCESS(
+                f"Recalculated ratings for {updated} titles."
+            ))
+        if imported.get(Title):
+            if touched_titles is None:
+                rebuild_search_index(Title)
+            else:
+                index_titles(titles.only("id", "name").iterator())
             self.stdout.write(
-                self.style.SUCCESS(
-                    f"Successfully imported {count} rows "
-                    f"into {model.__name__}."
-                )
+                self.style.SUCCESS("Updated title search index.")
             )
-
-    def import_genre_title(self, file_path):
-        """Специальный обработчик genre_title.csv. Работает с М2М связью."""
-
-        with open(file_path, encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            count = 0
-            for row in reader:
-                try:
-                    title = Title.objects.get(id=row["title_id"])
-                    genre = Genre.objects.get(id=row["genre_id"])
-                    title.genre.add(genre)
-                    count += 1
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f"Error importing row {row}: {e}")
-                    )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+from reviews.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс названий произведений."
+
+    def handle(self, *args, **options):
+        rebuild_search_index(Title)
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_generation
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает суммы оценок и рейтинги произведений по отзывам."
+
+    def handle(self, *args, **options):
+        updated = Title.objects.recalculate_ratings()
+        Title.objects.refresh_weighted_ratings()
+        # Рейтинги входят в закэшированные ответы о произведениях.
+        bump_generation("titles")
+        self.stdout.write(
+            self.style.SUCCESS(f"Recalculated ratings for {updated} titles.")
+        )
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import bump_generation
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает среднюю оценку и байесовские рейтинги всех "
+        "произведений."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep refreshing every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.LEADERBOARD_REFRESH_INTERVAL,
+            help="Seconds between refreshes with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        if options["interval"] < 0:
+            raise CommandError("--interval must be non-negative.")
+        try:
+            while True:
+                prior_mean = Title.objects.refresh_weighted_ratings()
+                # Рейтинги входят в закэшированный /titles/top/.
+                bump_generation("titles")
+                self.stdout.write(self.style.SUCCESS(
+                    f"Refreshed weighted ratings, prior mean "
+                    f"{prior_mean:.3f}."
+                ))
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from reviews.search import (create_search_table, drop_search_table,
+                            rebuild_search_index)
+
+
+def create_title_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if create_search_table(connection):
+        rebuild_search_index(
+            apps.get_model('reviews', 'Title'), connection
+        )
+
+
+def drop_title_search_index(apps, schema_editor):
+    drop_search_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_title_search_index, drop_title_search_index
+        ),
+    ]
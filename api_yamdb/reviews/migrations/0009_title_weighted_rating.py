@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-17 07:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Cast
+
+from reviews.constants import MAX_SCORE, MIN_SCORE
+
+
+def fill_weighted_rating(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    totals = Title.objects.aggregate(
+        score=Sum('score_sum'), count=Sum('review_count')
+    )
+    if totals['count']:
+        prior_mean = totals['score'] / totals['count']
+    else:
+        prior_mean = (MIN_SCORE + MAX_SCORE) / 2
+    weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    Title.objects.update(weighted_rating=(
+        (Cast(F('score_sum'), FloatField()) + Value(weight * prior_mean))
+        / (Cast(F('review_count'), FloatField()) + Value(float(weight)))
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Байесовский рейтинг'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-weighted_rating', 'id'], name='title_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-weighted_rating'], name='title_category_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', '-weighted_rating'], name='title_year_top_idx'),
+        ),
+        migrations.RunPython(
+            fill_weighted_rating, migrations.RunPython.noop
+        ),
+    ]
@@ -1,8 +1,13 @@
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (Count, ExpressionWrapper, F, FloatField,
+                              IntegerField, OuterRef, Subquery, Sum, Value)
+from django.db.models.functions import Cast, Coalesce, NullIf
 
 from reviews.constants import (TEXT_MAX_LENGTH, SLUG_MAX_LENGTH,
                                MIN_SCORE, MAX_SCORE)
@@ -54,8 +59,157 @@ class Category(models.Model):
         return self.name
 
 
+def rating_expression(score_sum, review_count):
+    """SQL-выражение среднего балла; NULL, если отзывов нет."""
+    return (Cast(score_sum, FloatField())
+            / Cast(NullIf(review_count, 0), FloatField()))
+
+
+def weighted_rating_expression(score_sum, review_count, prior_mean):
+    """Байесовский рейтинг: (S + m * C) / (n + m).
+
+    C — средняя оценка по всем отзывам, m — вес априорного среднего
+    (LEADERBOARD_PRIOR_WEIGHT). Произведение с единственной десяткой
+    не обгоняет произведение с сотнями отзывов в среднем на девять.
+    """
+    weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    return ExpressionWrapper(
+        (Cast(score_sum, FloatField()) + Value(weight * prior_mean))
+        / (Cast(review_count, FloatField()) + Value(float(weight))),
+        output_field=FloatField()
+    )
+
+
+class TitleQuerySet(models.QuerySet):
+    """Операции над денормализованными агрегатами оценок произведений."""
+    prior_mean_cache_key = 'reviews:leaderboard:prior_mean'
+
+    def apply_score_delta(self, score_delta, count_delta):
+        """Сдвигает сумму и количество оценок одним UPDATE.
+
+        Рейтинг и байесовский рейтинг пересчитываются в том же
+        выражении, поэтому гонок между параллельными отзывами
+        не возникает.
+        """
+        score_sum = F('score_sum') + score_delta
+        review_count = F('review_count') + count_delta
+        return self.update(
+            score_sum=score_sum,
+            review_count=review_count,
+            rating=rating_expression(score_sum, review_count),
+            weighted_rating=weighted_rating_expression(
+                score_sum, review_count, self.get_prior_mean()
+            ),
+        )
+
+    def get_prior_mean(self):
+        """Средняя оценка по всем отзывам для байесовского рейтинга.
+
+        Возвращает значение, сохранённое последним пересчётом
+        (команда refresh_leaderboard); между пересчётами рейтинги
+        обновляются инкрементально. Если значения в кэше нет, оно
+        считается одним агрегатом без перезаписи рейтингов.
+        """
+        cache = caches[settings.LEADERBOARD_CACHE_ALIAS]
+        prior_mean = cache.get(self.prior_mean_cache_key)
+        if prior_mean is None:
+            cache.add(self.prior_mean_cache_key, self.compute_prior_mean(),
+                      None)
+            prior_mean = cache.get(self.prior_mean_cache_key)
+        return prior_mean
+
+    def compute_prior_mean(self):
+        totals = self.model.objects.aggregate(
+            score=Sum('score_sum'), count=Sum('review_count')
+        )
+        if totals['count']:
+            return totals['score'] / totals['count']
+        return (MIN_SCORE + MAX_SCORE) / 2
+
+    def refresh_weighted_ratings(self):
+        """Пересчитывает среднее C и байесовские рейтинги всех произведений.
+
+        Переписывает всю таблицу, поэтому вызывается из management-команд,
+        а не из запросов.
+        """
+        prior_mean = self.compute_prior_mean()
+        self.model.objects.update(weighted_rating=weighted_rating_expression(
+            F('score_sum'), F('review_count'), prior_mean
+        ))
+        caches[settings.LEADERBOARD_CACHE_ALIAS].set(
+            self.prior_mean_cache_key, prior_mean, None
+        )
+        return prior_mean
+
+    def top(self):
+        """Произведения с отзывами по убыванию байесовского рейтинга."""
+        return self.filter(review_count__gt=0).order_by(
+            '-weighted_rating', 'id'
+        )
+
+    def bulk_create_with_pks(self, objs):
+        """bulk_create, после которого у всех объектов заполнен pk.
+
+        Django 3.2 не получает id из bulk INSERT на SQLite. Внутри
+        транзакции SQLite держит блокировку записи, поэтому новые
+        строки — это последние len(objs) id таблицы.
+        """
+        connection = connections[self.db]
+        if connection.features.can_return_rows_from_bulk_insert:
+            return self.bulk_create(objs)
+        with transaction.atomic(using=self.db):
+            if connection.vendor != 'sqlite':
+                for obj in objs:
+                    obj.save(using=self.db, force_insert=True)
+                return objs
+            self.bulk_create(objs)
+            pks = list(self.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(objs)])
+            for obj, pk in zip(objs, reversed(pks)):
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = self.db
+        return objs
+
+    def recalculate_ratings(self):
+        """Полностью пересчитывает агрегаты оценок по таблице отзывов.
+
+        Байесовский рейтинг пересчитывается только для произведений
+        queryset с сохранённым средним C; само среднее и рейтинги всех
+        произведений обновляет refresh_weighted_ratings.
+        """
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        score_sum = Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')),
+            0,
+            output_field=IntegerField()
+        )
+        review_count = Coalesce(
+            Subquery(reviews.annotate(total=Count('pk')).values('total')),
+            0,
+            output_field=IntegerField()
+        )
+        updated = self.update(
+            score_sum=score_sum,
+            review_count=review_count,
+            rating=rating_expression(score_sum, review_count),
+        )
+        self.update(weighted_rating=weighted_rating_expression(
+            F('score_sum'), F('review_count'), self.get_prior_mean()
+        ))
+        return updated
+
+
 class Title(models.Model):
-    """Модель для произведений."""
+    """Модель для произведений.
+
+    Поля score_sum, review_count, rating и weighted_rating
+    поддерживаются инкрементально при изменении отзывов
+    (см. reviews.signals).
+    """
     name = models.CharField(
         max_length=TEXT_MAX_LENGTH,
         verbose_name="Наименование произведения"
@@ -81,11 +235,47 @@ class Title(models.Model):
         related_name="titles",
         verbose_name="Категория",
     )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Сумма оценок"
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество отзывов"
+    )
+    rating = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Рейтинг"
+    )
+    weighted_rating = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Байесовский рейтинг"
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Произведение"
         verbose_name_plural = "Произведения"
         ordering = ['name']
+        indexes = [
+            models.Index(
+                fields=['-weighted_rating', 'id'], name='title_top_idx'
+            ),
+            models.Index(
+                fields=['category', '-weighted_rating'],
+                name='title_category_top_idx'
+            ),
+            models.Index(
+                fields=['year', '-weighted_rating'], name='title_year_top_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -119,17 +309,37 @@ class Review(models.Model):
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
                 name='unique_review'
             )
         ]
+        # Отзывы читаются списком произведения по убыванию даты,
+        # поэтому сортировка выполняется обратным проходом по индексу.
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='review_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_MAX_LENGTH]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем сохранённую оценку для расчёта дельты рейтинга."""
+        instance = super().from_db(db, field_names, values)
+        instance._saved_score = instance.__dict__.get('score')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняем отзыв и агрегаты произведения в одной транзакции."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Модель для комментариев к отзывам."""
@@ -151,7 +361,13 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='comment_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_MAX_LENGTH]
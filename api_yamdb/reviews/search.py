@@ -0,0 +1,143 @@
+"""
+Полнотекстовый индекс названий произведений.
+
+На SQLite с FTS5 названия дублируются в виртуальную таблицу
+с триграммным токенизатором. В индекс пишется нормализованный текст
+(casefold, без диакритики), поэтому поиск не зависит от регистра
+и диакритики, в том числе для кириллицы. На остальных бэкендах
+используется прежний поиск через icontains.
+"""
+import unicodedata
+from itertools import islice
+
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'reviews_title_search'
+# Триграммный индекс применим только к подстрокам от трёх символов.
+TRIGRAM_LENGTH = 3
+REBUILD_BATCH_SIZE = 2000
+
+
+def normalize_search_text(text):
+    """Приводит текст к виду, в котором он хранится в индексе."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+def get_search_connection():
+    from reviews.models import Title
+    return connections[router.db_for_write(Title)]
+
+
+def is_fts_available(connection):
+    """Есть ли на подключении таблица полнотекстового индекса.
+
+    Результат запоминается на объекте подключения.
+    """
+    available = getattr(connection, '_title_search_available', None)
+    if available is None:
+        available = connection.vendor == 'sqlite'
+        if available:
+            with connection.cursor() as cursor:
+                available = SEARCH_TABLE in (
+                    connection.introspection.table_names(cursor)
+                )
+        connection._title_search_available = available
+    return available
+
+
+def create_search_table(connection):
+    """Создаёт таблицу индекса; возвращает False, если FTS5 недоступен."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+        if 'ENABLE_FTS5' not in options:
+            return False
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+            "USING fts5(name, tokenize='trigram')"
+        )
+    connection._title_search_available = True
+    return True
+
+
+def drop_search_table(connection):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+    connection._title_search_available = False
+
+
+def index_titles(titles):
+    """Добавляет или обновляет названия в индексе."""
+    connection = get_search_connection()
+    if not is_fts_available(connection):
+        return
+    rows = [(title.pk, normalize_search_text(title.name)) for title in titles]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name) '
+            'VALUES (%s, %s)',
+            rows
+        )
+
+
+def unindex_titles(pks):
+    """Удаляет названия из индекса."""
+    connection = get_search_connection()
+    if not is_fts_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in pks]
+        )
+
+
+def rebuild_search_index(title_model, connection=None):
+    """Перестраивает индекс целиком, например после bulk-операций."""
+    connection = connection or get_search_connection()
+    if not is_fts_available(connection):
+        return
+    titles = title_model.objects.using(connection.alias).order_by(
+        'pk'
+    ).values_list('pk', 'name').iterator(chunk_size=REBUILD_BATCH_SIZE)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        while True:
+            batch = [
+                (pk, normalize_search_text(name))
+                for pk, name in islice(titles, REBUILD_BATCH_SIZE)
+            ]
+            if not batch:
+                break
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name) '
+                'VALUES (%s, %s)',
+                batch
+            )
+
+
+def escape_glob(text):
+    return ''.join(
+        f'[{char}]' if char in '*?[' else char for char in text
+    )
+
+
+def filter_by_name(queryset, value):
+    """Фильтрует произведения по подстроке названия через индекс."""
+    if not is_fts_available(get_search_connection()):
+        return queryset.filter(name__icontains=value)
+    term = normalize_search_text(value)
+    if len(term) >= TRIGRAM_LENGTH:
+        condition, param = 'name GLOB %s', f'*{escape_glob(term)}*'
+    else:
+        condition, param = 'instr(name, %s) > 0', term
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {condition}', [param]
+    ))
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Review, Title
+from reviews.search import index_titles, unindex_titles
+
+
+@receiver(post_save, sender=Review)
+def update_title_rating_on_save(sender, instance, created, raw, **kwargs):
+    """Применяет изменение оценки к агрегатам произведения."""
+    if raw:
+        return
+    titles = Title.objects.filter(pk=instance.title_id)
+    saved_score = getattr(instance, '_saved_score', None)
+    if created:
+        titles.apply_score_delta(instance.score, 1)
+    elif saved_score is None:
+        titles.recalculate_ratings()
+    elif saved_score != instance.score:
+        titles.apply_score_delta(instance.score - saved_score, 0)
+    instance._saved_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def update_title_rating_on_delete(sender, instance, **kwargs):
+    """Вычитает удалённый отзыв из агрегатов произведения."""
+    score = getattr(instance, '_saved_score', None)
+    if score is None:
+        score = instance.score
+    Title.objects.filter(pk=instance.title_id).apply_score_delta(-score, -1)
+
+
+@receiver(post_save, sender=Title)
+def index_title_name(sender, instance, raw, update_fields, **kwargs):
+    """Синхронизирует полнотекстовый индекс названий."""
+    if raw or (update_fields is not None and 'name' not in update_fields):
+        return
+    index_titles([instance])
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title_name(sender, instance, **kwargs):
+    unindex_titles([instance.pk])
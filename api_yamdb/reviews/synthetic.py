@@ -0,0 +1,237 @@
+"""
+Воспроизводимая генерация синтетических данных для нагрузочных тестов.
+
+Популярность произведений, категорий и жанров распределена по закону
+Ципфа: несколько произведений собирают большую часть отзывов, а
+у большинства их единицы. Оценки зависят от «качества» произведения,
+поэтому средние рейтинги различаются. Каждая таблица генерируется
+своим генератором случайных чисел, производным от общего seed, так что
+при тех же параметрах получаются те же строки в любом порядке вывода.
+
+Строки отдаются словарями attname -> значение, как их принимает
+reviews.importing.Importer.
+"""
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from reviews.constants import MAX_SCORE, MIN_SCORE, TEXT_MAX_LENGTH
+from users.models import ADMIN, MODERATOR, USER
+
+# Конец периода дат публикаций: фиксирован ради воспроизводимости.
+DATASET_END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DATASET_SPAN = timedelta(days=5 * 365)
+FIRST_YEAR = 1900
+LAST_YEAR = DATASET_END.year
+
+WORDS = (
+    "тайна ночь город море звезда дорога огонь тень ветер зима лето "
+    "сердце песня война мир остров замок река небо время память "
+    "призрак лес свет дом путь король сад гроза берег шторм эхо "
+    "легенда маяк сон голос пламя утро вечер граница полёт"
+).split()
+
+
+def zipf_cum_weights(count, exponent):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(
+        accumulate(1 / rank ** exponent for rank in range(1, count + 1))
+    )
+
+
+class DatasetGenerator:
+
+    def __init__(self, seed=0, users=1000, categories=8, genres=30,
+                 titles=10000, reviews=100000, comments=10000,
+                 zipf_exponent=1.1):
+        self.seed = seed
+        self.counts = {
+            "users": users, "categories": categories, "genres": genres,
+            "titles": titles, "reviews": reviews, "comments": comments,
+        }
+        self.zipf_exponent = zipf_exponent
+        self._review_counts = None
+
+    def random(self, table):
+        """Отдельный поток случайных чисел для таблицы."""
+        return random.Random(f"{self.seed}:{table}")
+
+    def text(self, rng, words):
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    def pub_date(self, rng):
+        seconds = rng.randrange(int(DATASET_SPAN.total_seconds()))
+        return DATASET_END - timedelta(seconds=seconds)
+
+    def users(self):
+        rng = self.random("users")
+        for pk in range(1, self.counts["users"] + 1):
+            draw = rng.random()
+            role = ADMIN if draw < 0.001 else (
+                MODERATOR if draw < 0.011 else USER
+            )
+            yield {
+                "id": pk,
+                "username": f"user{pk}",
+                "email": f"user{pk}@yamdb.fake",
+                "role": role,
+                "bio": "",
+                "first_name": "",
+                "last_name": "",
+            }
+
+    def categories(self):
+        for pk in range(1, self.counts["categories"] + 1):
+            yield {"id": pk, "name": f"Категория {pk}",
+                   "slug": f"category-{pk}"}
+
+    def genres(self):
+        for pk in range(1, self.counts["genres"] + 1):
+            yield {"id": pk, "name": f"Жанр {pk}", "slug": f"genre-{pk}"}
+
+    def titles(self):
+        rng = self.random("titles")
+        categories = self.counts["categories"]
+        cum_weights = zipf_cum_weights(categories, self.zipf_exponent)
+        for pk in range(1, self.counts["titles"] + 1):
+            name = self.text(rng, rng.randint(1, 4)).capitalize()
+            category = None
+            if categories:
+                category = bisect_left(
+                    cum_weights, rng.random() * cum_weights[-1]
+                ) + 1
+            yield {
+                "id": pk,
+                "name": f"{name} {pk}"[:TEXT_MAX_LENGTH],
+                "year": rng.randint(FIRST_YEAR, LAST_YEAR),
+                "description": self.text(rng, rng.randint(0, 12)) or None,
+                "category_id": category,
+            }
+
+    def genre_titles(self):
+        rng = self.random("genre_titles")
+        genres = self.counts["genres"]
+        if not genres:
+            return
+        cum_weights = zipf_cum_weights(genres, self.zipf_exponent)
+        total = cum_weights[-1]
+        for pk in range(1, self.counts["titles"] + 1):
+            chosen = {
+                bisect_left(cum_weights, rng.random() * total) + 1
+                for _ in range(rng.randint(1, 3))
+            }
+            for genre in sorted(chosen):
+                yield {"title_id": pk, "genre_id": genre}
+
+    def review_counts(self):
+        """
+        Число отзывов на каждое произведение по закону Ципфа.
+
+        Ранги популярности перемешаны, чтобы популярные произведения
+        не шли первыми по id. Отзывов на произведение не больше, чем
+        пользователей: один автор пишет один отзыв. Отзывы сверх этого
+        предела распределяются по тем же весам между произведениями,
+        которые его ещё не достигли, так что сумма равна заданной.
+        """
+        if self._review_counts is not None:
+            return self._review_counts
+        rng = self.random("review_counts")
+        titles = self.counts["titles"]
+        users = self.counts["users"]
+        total = self.counts["reviews"]
+        if total > titles * users:
+            raise ValueError(
+                f"Нельзя написать {total} отзывов на {titles} произведений "
+                f"от {users} пользователей."
+            )
+        counts = [0] * titles
+        if titles and total:
+            ranks = list(range(titles))
+            rng.shuffle(ranks)
+            weights = [1 / (rank + 1) ** self.zipf_exponent for rank in ranks]
+            indexes = range(titles)
+            remaining = total
+            while remaining:
+                weight_sum = sum(weights[index] for index in indexes)
+                shares = [
+                    remaining * weights[index] / weight_sum
+                    for index in indexes
+                ]
+                full = [
+                    index for index, share in zip(indexes, shares)
+                    if counts[index] + share >= users
+                ]
+                if full:
+                    # Заполняем упёршиеся в предел и делим остаток
+                    # заново между остальными.
+                    for index in full:
+                        remaining -= users - counts[index]
+                        counts[index] = users
+                    indexes = [
+                        index for index in indexes if counts[index] < users
+                    ]
+                    continue
+                for index, share in zip(indexes, shares):
+                    counts[index] += int(share)
+                    remaining -= int(share)
+                cum_weights = list(
+                    accumulate(weights[index] for index in indexes)
+                )
+                while remaining:
+                    position = bisect_left(
+                        cum_weights, rng.random() * weight_sum
+                    )
+                    index = indexes[min(position, len(indexes) - 1)]
+                    if counts[index] < users:
+                        counts[index] += 1
+                        remaining -= 1
+        self._review_counts = counts
+        return counts
+
+    def reviews(self):
+        rng = self.random("reviews")
+        users = range(1, self.counts["users"] + 1)
+        pk = 0
+        for title_id, count in enumerate(self.review_counts(), 1):
+            if not count:
+                continue
+            quality = rng.gauss(7, 1.5)
+            for author in rng.sample(users, count):
+                pk += 1
+                score = round(rng.gauss(quality, 1.8))
+                yield {
+                    "id": pk,
+                    "title_id": title_id,
+                    "text": self.text(rng, rng.randint(3, 30)),
+                    "author_id": author,
+                    "score": min(MAX_SCORE, max(MIN_SCORE, score)),
+                    "pub_date": self.pub_date(rng),
+                }
+
+    def comments(self):
+        rng = self.random("comments")
+        reviews = sum(self.review_counts())
+        users = self.counts["users"]
+        if not reviews or not users:
+            return
+        for pk in range(1, self.counts["comments"] + 1):
+            yield {
+                "id": pk,
+                "review_id": rng.randint(1, reviews),
+                "text": self.text(rng, rng.randint(2, 20)),
+                "author_id": rng.randint(1, users),
+                "pub_date": self.pub_date(rng),
+            }
+
+    def rows(self, spec):
+        """Строки для файла описания spec из IMPORT_SPECS."""
+        return {
+            "users.csv": self.users,
+            "category.csv": self.categories,
+            "genre.csv": self.genres,
+            "titles.csv": self.titles,
+            "genre_title.csv": self.genre_titles,
+            "review.csv": self.reviews,
+            "comments.csv": self.comments,
+        }[spec.file]()
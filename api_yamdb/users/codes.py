@@ -0,0 +1,105 @@
+"""
+Коды подтверждения почты.
+
+Код хранится в таблице ConfirmationCode вместе с id пользователя
+и истекает через CONFIRMATION_CODE_TIMEOUT секунд. Запись кода — один
+INSERT ... ON CONFLICT, проверка — запрос по первичному ключу. Каждая
+выдача кода удаляет истёкшие строки по индексу expires_at, так что
+в таблице остаются только коды, выданные за последний срок действия.
+Код одноразовый: его гасит первый успешный обмен на токен. Таблица
+пользователей при этом не изменяется.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from users.models import ConfirmationCode
+from users.utils import generate_confirmation_code
+
+
+def code_key(username):
+    """Ключ фиксированной длины для username любого состава."""
+    return hashlib.sha256(username.encode()).hexdigest()
+
+
+def purge_expired_codes(now=None):
+    """Удаляет истёкшие коды одним DELETE и возвращает их число."""
+    queryset = ConfirmationCode.objects.filter(
+        expires_at__lte=now or timezone.now()
+    )
+    # У кода нет зависимых объектов: каскад и сигналы не нужны.
+    return queryset._raw_delete(queryset.db)
+
+
+def save_code(key, user_id, code, expires_at):
+    """Записывает код взамен прежнего одним INSERT ... ON CONFLICT."""
+    using = router.db_for_write(ConfirmationCode)
+    connection = connections[using]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        ConfirmationCode.objects.using(using).update_or_create(
+            key=key,
+            defaults={
+                'user_id': user_id, 'code': code, 'expires_at': expires_at
+            },
+        )
+        return
+    quote = connection.ops.quote_name
+    meta = ConfirmationCode._meta
+    fields = [meta.get_field(name) for name in (
+        'key', 'user', 'code', 'expires_at'
+    )]
+    values = [
+        field.get_db_prep_save(value, connection=connection)
+        for field, value in zip(fields, (key, user_id, code, expires_at))
+    ]
+    columns = ', '.join(quote(field.column) for field in fields)
+    assignments = ', '.join(
+        f'{quote(field.column)} = excluded.{quote(field.column)}'
+        for field in fields[1:]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+            f'VALUES (%s, %s, %s, %s) '
+            f'ON CONFLICT ({quote(meta.pk.column)}) DO UPDATE SET '
+            f'{assignments}',
+            values,
+        )
+
+
+def issue_code(user):
+    """Выдаёт новый код взамен прежнего и возвращает его."""
+    now = timezone.now()
+    purge_expired_codes(now)
+    code = generate_confirmation_code()
+    save_code(
+        code_key(user.username), user.pk, code,
+        now + timedelta(seconds=settings.CONFIRMATION_CODE_TIMEOUT),
+    )
+    return code
+
+
+def consume_code(username, code):
+    """
+    Гасит код и возвращает id пользователя, для которого он выдан,
+    или None, если код неверен, истёк или уже использован.
+    """
+    key = code_key(username)
+    now = timezone.now()
+    stored = ConfirmationCode.objects.filter(
+        key=key, expires_at__gt=now
+    ).values_list('user_id', 'code').first()
+    if stored is None or not constant_time_compare(stored[1], str(code)):
+        return None
+    # Строку удалит только один из параллельных запросов; код,
+    # выданный заново между чтением и удалением, не затрагивается.
+    queryset = ConfirmationCode.objects.filter(
+        key=key, code=stored[1], expires_at__gt=now
+    )
+    if not queryset._raw_delete(queryset.db):
+        return None
+    return stored[0]
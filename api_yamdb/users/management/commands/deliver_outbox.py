@@ -0,0 +1,63 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from users.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Отправляет письма из очереди OutboundEmail через одно "
+        "SMTP-соединение."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Messages claimed per batch.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting when empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls of an empty outbox.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] <= 0 or options["interval"] < 0:
+            raise CommandError(
+                "--batch-size must be positive and --interval non-negative."
+            )
+        connection = get_connection()
+        claimed_total = sent_total = 0
+        try:
+            while True:
+                claimed, sent = deliver_pending(
+                    connection, options["batch_size"]
+                )
+                claimed_total += claimed
+                sent_total += sent
+                if claimed:
+                    continue
+                # Простаивающее соединение сервер всё равно закроет.
+                connection.close()
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        failed = claimed_total - sent_total
+        message = f"Sent {sent_total} emails."
+        if failed:
+            message += f" {failed} failed and will be retried or dropped."
+        self.stdout.write(self.style.SUCCESS(message))
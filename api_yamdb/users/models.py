@@ -1,7 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-
-from users.utils import generate_confirmation_code
+from django.utils import timezone
 
 USER = 'user'
 MODERATOR = 'moderator'
@@ -18,12 +17,11 @@ class User(AbstractUser):
     """
     Кастомная модель пользователя с ролями.
     Роли: user, moderator, admin.
-    Имеет поле для confirmation_code.
+    Коды подтверждения хранятся в ConfirmationCode (см. users.codes).
     """
     email = models.EmailField(unique=True, blank=False, null=False)
     bio = models.TextField(blank=True)
     role = models.CharField(max_length=20, choices=ROLES, default=USER)
-    confirmation_code = models.CharField(max_length=6, blank=True, null=True)
 
     @property
     def is_admin(self):
@@ -41,6 +39,56 @@ class User(AbstractUser):
         return self.role == USER
 
     def set_new_confirmation_code(self):
-        """Устанавливает новый код подтверждения и сохраняет пользователя."""
-        self.confirmation_code = generate_confirmation_code()
-        self.save(update_fields=['confirmation_code'])
+        """Выдаёт новый код подтверждения и возвращает его."""
+        from users.codes import issue_code
+        return issue_code(self)
+
+
+class ConfirmationCode(models.Model):
+    """
+    Действующий код подтверждения почты.
+
+    Строка на пользователя; ключ — sha256 от username, чтобы код
+    находился по username из запроса без обращения к таблице
+    пользователей. Истёкшие строки удаляются при выдаче новых кодов
+    (см. users.codes).
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    code = models.CharField(max_length=32)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.user_id} до {self.expires_at}'
+
+
+class OutboundEmail(models.Model):
+    """
+    Письмо в очереди на отправку.
+
+    Запрос только добавляет строку, а доставляет письма команда
+    deliver_outbox (см. users.outbox). Отправленные письма остаются
+    в таблице с заполненным sent_at.
+    """
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=('sent_at', 'failed', 'next_attempt_at'),
+                name='outbox_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipient}'
@@ -0,0 +1,116 @@
+"""
+Очередь исходящих писем.
+
+enqueue_email записывает письмо в таблицу OutboundEmail, не обращаясь
+к почтовому серверу, поэтому время ответа не зависит от SMTP.
+deliver_pending забирает созревшие письма пачкой и отправляет их через
+одно соединение; неудачные попытки повторяются с экспоненциальной
+задержкой, после EMAIL_OUTBOX_MAX_ATTEMPTS письмо помечается failed.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import OutboundEmail
+
+# Сколько письмо считается занятым воркером, пока тот его отправляет.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def enqueue_email(subject, message, recipient, from_email=None):
+    """
+    Ставит письмо в очередь. С EMAIL_OUTBOX_EAGER письмо отправляется
+    сразу — для разработки и тестов без воркера.
+    """
+    email = OutboundEmail.objects.create(
+        recipient=recipient,
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+    )
+    if settings.EMAIL_OUTBOX_EAGER:
+        connection = get_connection()
+        try:
+            deliver(connection, [email])
+        finally:
+            connection.close()
+    return email
+
+
+def retry_delay(attempts):
+    return timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def schedule_retry(email, error):
+    """Откладывает письмо после ошибки или помечает его failed."""
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    email.failed = email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=(
+        'attempts', 'last_error', 'failed', 'next_attempt_at'
+    ))
+
+
+def claim_pending(limit):
+    """
+    Забирает до limit созревших писем. Забранные письма откладываются
+    на CLAIM_TIMEOUT, чтобы их не отправил параллельный воркер; если
+    воркер упадёт, письма вернутся в очередь по истечении срока.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(sent_at=None, failed=False, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        OutboundEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    return emails
+
+
+def deliver(connection, emails):
+    """
+    Отправляет письма через одно соединение, открывая его при
+    необходимости; закрывает соединение вызывающий код.
+
+    После ошибки соединение закрывается: следующее письмо откроет
+    новое. Возвращает число отправленных писем.
+    """
+    sent = 0
+    for email in emails:
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=email.from_email or None,
+            to=[email.recipient],
+            connection=connection,
+        )
+        try:
+            # Открытое заранее соединение send() не закрывает.
+            connection.open()
+            message.send()
+        except Exception as error:
+            connection.close()
+            schedule_retry(email, error)
+            continue
+        email.attempts += 1
+        email.sent_at = timezone.now()
+        email.save(update_fields=('attempts', 'sent_at'))
+        sent += 1
+    return sent
+
+
+def deliver_pending(connection, limit=100):
+    """Отправляет одну пачку; возвращает (забрано, отправлено)."""
+    emails = claim_pending(limit)
+    if not emails:
+        return 0, 0
+    return len(emails), deliver(connection, emails)
@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import caches
+
+from api.throttling import buckets
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """База очищается между тестами, поэтому сбрасываем кэши и корзины."""
+    for cache in caches.all():
+        cache.clear()
+    buckets.clear()
+    yield
+    for cache in caches.all():
+        cache.clear()
+    buckets.clear()
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Контекстный менеджер, проверяющий число SQL-запросов в блоке.
+
+    Использование:
+        with query_budget('titles-list', 4):
+            client.get('/api/v1/titles/')
+    """
+    @contextmanager
+    def check(name, budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = context.captured_queries
+        assert len(executed) <= budget, (
+            f'Эндпоинт `{name}` выполнил {len(executed)} SQL-запросов '
+            f'при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in executed)
+        )
+    return check
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def get_rating(self, client, title_id):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.status_code == HTTPStatus.OK
+        return response.json()['rating']
+
+    def test_01_rating_follows_review_changes(self, client, admin_client,
+                                              user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        assert self.get_rating(client, title_id) is None
+
+        review_id = create_single_review(
+            user_client, title_id, 'first', 10
+        ).json()['id']
+        create_single_review(moderator_client, title_id, 'second', 5)
+        assert self.get_rating(client, title_id) == 7.5, (
+            'Проверьте, что рейтинг произведения не округляется до целого.'
+        )
+
+        url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=review_id
+        )
+        response = user_client.patch(url, data={'score': 2})
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(client, title_id) == 3.5
+
+        response = user_client.delete(url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(client, title_id) == 5
+
+    def test_02_rating_after_author_delete(self, client, admin_client,
+                                           user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'text', 8)
+        create_single_review(admin_client, title_id, 'text', 4)
+
+        user.delete()
+        assert self.get_rating(client, title_id) == 4
+
+    def test_03_recalculate_ratings_command(self, client, admin_client,
+                                            user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'text', 9)
+        Title.objects.update(score_sum=0, review_count=0, rating=None)
+
+        call_command('recalculate_ratings', stdout=StringIO())
+        title = Title.objects.get(pk=title_id)
+        assert (title.score_sum, title.review_count) == (9, 1)
+        assert self.get_rating(client, title_id) == 9
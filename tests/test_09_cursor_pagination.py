@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Title
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09CursorPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def walk(self, client, url):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data, (
+            'Проверьте, что в курсорном режиме не выполняется подсчёт '
+            'общего количества объектов.'
+        )
+        return data
+
+    def collect(self, client, url, key):
+        seen = []
+        pages = []
+        while url:
+            data = self.walk(client, url)
+            pages.append(data)
+            seen.extend(item[key] for item in data['results'])
+            url = data['next']
+        return seen, pages
+
+    def test_01_titles_cursor(self, client):
+        for idx in range(5):
+            Title.objects.create(name='Одинаковое', year=2000 + idx)
+        Title.objects.create(name='Другое', year=1999)
+        expected = list(
+            Title.objects.order_by('name', 'id').values_list('id', flat=True)
+        )
+
+        seen, pages = self.collect(
+            client, f'{self.TITLES_URL}?cursor=&limit=2', 'id'
+        )
+        assert seen == expected, (
+            'Проверьте, что курсорная пагинация возвращает каждое '
+            'произведение ровно один раз в порядке (name, id).'
+        )
+        assert len(pages) == 3
+
+        previous = self.walk(client, pages[-1]['previous'])
+        assert [item['id'] for item in previous['results']] == expected[2:4]
+
+    def test_02_reviews_cursor_and_limit_offset(self, client, admin_client,
+                                                admin, user, user_client,
+                                                moderator, moderator_client):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        seen, _ = self.collect(client, f'{url}?cursor=&limit=1', 'id')
+        assert sorted(seen) == sorted(review['id'] for review in reviews)
+
+        response = client.get(url)
+        assert response.json()['count'] == len(reviews), (
+            'Проверьте, что без параметра `cursor` пагинация не изменилась.'
+        )
+
+        response = client.get(f'{self.TITLES_URL}?limit=1&offset=1')
+        data = response.json()
+        assert data['count'] == 2 and len(data['results']) == 1
+
+        response = client.get(f'{url}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
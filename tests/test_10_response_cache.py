@@ -0,0 +1,74 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.cache import CacheHandler
+from django.core.management import call_command
+
+from api.cache import generation_key, get_generations
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10ResponseCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    CATEGORY_DETAIL_URL_TEMPLATE = '/api/v1/categories/{slug}/'
+
+    def test_01_repeat_read_skips_orm(self, client, admin_client,
+                                      django_assert_num_queries):
+        create_titles(admin_client)
+        url = f'{self.TITLES_URL}?year=1984&limit=5'
+        first = client.get(url)
+        assert first.status_code == HTTPStatus.OK
+
+        with django_assert_num_queries(0):
+            second = client.get(f'{self.TITLES_URL}?limit=5&year=1984')
+        assert second.json() == first.json()
+
+    def test_02_writes_invalidate(self, client, admin_client, user_client):
+        titles, categories, _ = create_titles(admin_client)
+        title_url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        assert client.get(title_url).json()['category'] == categories[0]
+
+        response = admin_client.delete(
+            self.CATEGORY_DETAIL_URL_TEMPLATE.format(
+                slug=categories[0]['slug']
+            )
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert client.get(title_url).json()['category'] == {
+            'name': '', 'slug': ''
+        }, (
+            'Проверьте, что удаление категории инвалидирует кэш '
+            'произведений.'
+        )
+
+        create_single_review(user_client, titles[0]['id'], 'text', 6)
+        assert client.get(title_url).json()['rating'] == 6
+
+    def test_03_command_bumps_reach_other_processes(self, client,
+                                                    admin_client):
+        create_titles(admin_client)
+        client.get(self.TITLES_URL)
+        before, = get_generations(['titles'])
+        call_command('recalculate_ratings', stdout=StringIO())
+        # Отдельный CacheHandler создаёт новые экземпляры бэкендов,
+        # как в другом процессе.
+        other = CacheHandler()[settings.RESPONSE_CACHE_ALIAS]
+        assert other.get(generation_key('titles')) > before, (
+            'Проверьте, что поколения хранятся в общем для процессов кэше '
+            'и recalculate_ratings инвалидирует ответы о произведениях.'
+        )
+
+    def test_04_links_follow_request_host(self, client, admin_client):
+        create_titles(admin_client)
+        url = f'{self.TITLES_URL}?limit=1'
+        first = client.get(url, HTTP_HOST='one.example')
+        second = client.get(url, HTTP_HOST='two.example', secure=True)
+        assert first.json()['next'].startswith('http://one.example/')
+        assert second.json()['next'].startswith('https://two.example/'), (
+            'Проверьте, что закэшированные ссылки next и previous '
+            'соответствуют хосту и схеме запроса.'
+        )
@@ -0,0 +1,84 @@
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11ConditionalGet:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_reviews_not_modified(self, client, admin_client, admin,
+                                     user_client, user,
+                                     django_assert_num_queries):
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        # Last-Modified отдаётся, когда секунда изменения уже прошла;
+        # первое чтение заводит счётчики поколений текущим временем.
+        client.get(url)
+        time.sleep(1)
+        response = client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        assert etag and last_modified, (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+            'заголовки ETag и Last-Modified.'
+        )
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        user_client.patch(
+            f'{url}{reviews[1]["id"]}/', data={'text': 'changed'}
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение отзыва меняет ETag списка отзывов.'
+        )
+        assert response['ETag'] != etag
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение отзыва меняет Last-Modified.'
+        )
+        assert response.get('Last-Modified') != last_modified
+
+    def test_02_comments_etag_changes(self, client, admin_client, admin,
+                                      user_client):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        etag = client.get(url)['ETag']
+        user_client.post(url, data={'text': 'comment'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == 1
+
+    def test_03_burst_of_writes_keeps_last_modified_current(
+        self, client, admin_client, admin
+    ):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        for idx in range(5):
+            admin_client.patch(
+                f'{url}{reviews[0]["id"]}/', data={'text': f'text {idx}'}
+            )
+        response = client.get(url)
+        if response.has_header('Last-Modified'):
+            modified = parsedate_to_datetime(response['Last-Modified'])
+            assert modified.timestamp() <= time.time(), (
+                'Проверьте, что серия записей не переносит Last-Modified '
+                'в будущее.'
+            )
@@ -0,0 +1,40 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def search(self, client, value):
+        response = client.get(self.TITLES_URL, {'name': value})
+        assert response.status_code == HTTPStatus.OK
+        return sorted(item['name'] for item in response.json()['results'])
+
+    def test_01_case_and_diacritic_insensitive(self, client):
+        Title.objects.create(name='Крёстный Отец', year=1972)
+        Title.objects.create(name='Café Society', year=2016)
+        Title.objects.create(name='Отель 100% *', year=2000)
+
+        assert self.search(client, 'КРЕСТ') == ['Крёстный Отец'], (
+            'Проверьте, что поиск по названию не зависит от регистра '
+            'и диакритики для кириллицы.'
+        )
+        assert self.search(client, 'cafe') == ['Café Society']
+        assert self.search(client, 'ОТ') == ['Крёстный Отец', 'Отель 100% *']
+        assert self.search(client, '% *') == ['Отель 100% *']
+        assert self.search(client, 'нет такого') == []
+
+    def test_02_index_follows_changes(self, client):
+        title = Title.objects.create(name='Старое имя', year=2000)
+        title.name = 'Новое имя'
+        title.save()
+        assert self.search(client, 'старое') == []
+        assert self.search(client, 'новое') == ['Новое имя']
+
+        title.delete()
+        assert self.search(client, 'новое') == []
@@ -0,0 +1,80 @@
+from http import HTTPStatus
+
+import pytest
+
+from api import registry
+from reviews.models import Genre, Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13SlugRegistry:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_titles_rendered_from_registry(self, client, admin_client,
+                                              django_assert_max_num_queries):
+        titles, _, genres = create_titles(admin_client)
+        client.get(self.TITLES_URL)
+
+        with django_assert_max_num_queries(3):
+            response = client.get(f'{self.TITLES_URL}?genre=horror&limit=5')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [titles[0]['id']]
+        assert data['results'][0]['genre'] == sorted(
+            genres[:2], key=lambda genre: genre['name']
+        )
+
+        response = client.get(f'{self.TITLES_URL}?category=unknown')
+        assert response.json()['results'] == []
+
+    def test_02_registry_invalidated_on_write(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[1]["id"]}/'
+        client.get(url)
+
+        genre = Genre.objects.get(slug='drama')
+        genre.name = 'Трагедия'
+        genre.save()
+        assert client.get(url).json()['genre'] == [
+            {'name': 'Трагедия', 'slug': 'drama'}
+        ]
+
+        response = admin_client.post('/api/v1/genres/', data={
+            'name': 'Новый', 'slug': 'new-genre'
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        response = admin_client.patch(url, data={'genre': ['new-genre']})
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что новый жанр сразу доступен для записи.'
+        )
+
+    def test_03_generation_read_once_per_request(self, client, admin_client,
+                                                 monkeypatch):
+        create_titles(admin_client)
+        Title.objects.bulk_create([
+            Title(name=f'Произведение {idx}', year=2000)
+            for idx in range(100)
+        ])
+        Title.genre.through.objects.bulk_create([
+            Title.genre.through(title_id=pk, genre_id=genre.pk)
+            for pk in Title.objects.values_list('pk', flat=True)
+            for genre in Genre.objects.all()[:2]
+        ], ignore_conflicts=True)
+        calls = []
+        get_generations = registry.get_generations
+
+        def counting_get_generations(resources):
+            calls.append(tuple(resources))
+            return get_generations(resources)
+
+        monkeypatch.setattr(
+            registry, 'get_generations', counting_get_generations
+        )
+        response = client.get(f'{self.TITLES_URL}?limit=100')
+        assert len(response.json()['results']) == 100
+        assert len(calls) <= 2, (
+            'Проверьте, что справочники читают поколение один раз '
+            f'за запрос, а не для каждого произведения: {len(calls)}.'
+        )
@@ -0,0 +1,42 @@
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14TitleValuesPath:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def render(self, client, url, values_path):
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        with override_settings(TITLE_LIST_VALUES_PATH=values_path):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+        assert response.status_code == 200
+        assert context.captured_queries, (
+            'Ответ должен строиться заново, а не браться из кэша.'
+        )
+        return response.content
+
+    @pytest.mark.parametrize('query', [
+        '', '?limit=100', '?genre=comedy', '?name=КРЕП', '?cursor=&limit=2',
+    ])
+    def test_01_values_path_is_byte_identical(self, query, client,
+                                              admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'text', 7)
+        Title.objects.create(name='Без категории', year=2001)
+
+        url = f'{self.TITLES_URL}{query}'
+        assert (self.render(client, url, values_path=True)
+                == self.render(client, url, values_path=False)), (
+            'Проверьте, что быстрый путь списка произведений возвращает '
+            'тот же ответ, что и TitleReadSerializer.'
+        )
@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+import pytest
+
+from api import serializers
+from reviews.models import Title
+from tests.utils import create_categories, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15TitleBulkCreate:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def payload(self, genres, categories, count):
+        return [
+            {
+                'name': f'Произведение {idx}',
+                'year': 1900 + idx,
+                'genre': [genres[idx % 3]['slug'], genres[0]['slug']],
+                'category': categories[idx % 2]['slug'],
+                'description': f'Описание {idx}',
+            }
+            for idx in range(count)
+        ]
+
+    def test_01_bulk_create(self, admin_client, client,
+                            django_assert_max_num_queries):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = self.payload(genres, categories, 50)
+
+        with django_assert_max_num_queries(10):
+            response = admin_client.post(
+                self.TITLES_URL, data=data, format='json'
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        created = response.json()
+        assert len(created) == 50
+        assert [item['name'] for item in created] == [
+            item['name'] for item in data
+        ]
+
+        for item in created[:5]:
+            detail = client.get(f'{self.TITLES_URL}{item["id"]}/').json()
+            assert detail['genre'] == item['genre']
+            assert detail['category'] == item['category']
+            assert detail['name'] == item['name']
+
+    def test_02_bulk_create_reports_errors(self, admin_client, user_client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        data = self.payload(genres, categories, 3)
+        data[1]['genre'] = ['unknown']
+        data[2]['year'] = 'дветыщи'
+
+        response = admin_client.post(self.TITLES_URL, data=data, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'genre' in errors[1] and 'year' in errors[2], (
+            'Проверьте, что ошибки массового создания указываются '
+            'для каждого элемента.'
+        )
+        assert not Title.objects.exists()
+
+        response = user_client.post(self.TITLES_URL, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_03_size_cap_checked_before_items(self, admin_client,
+                                              monkeypatch):
+        monkeypatch.setattr(serializers, 'TITLE_BULK_MAX_SIZE', 2)
+        validated = []
+        to_internal_value = serializers.TitleWriteSerializer.to_internal_value
+
+        def counting_to_internal_value(serializer, data):
+            validated.append(data)
+            return to_internal_value(serializer, data)
+
+        monkeypatch.setattr(
+            serializers.TitleWriteSerializer, 'to_internal_value',
+            counting_to_internal_value
+        )
+        data = [{'name': 'x', 'year': 2000}] * 3
+        response = admin_client.post(self.TITLES_URL, data=data, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {'non_field_errors': [
+            'Нельзя создать больше 2 произведений за один запрос.'
+        ]}
+        assert not validated, (
+            'Проверьте, что размер массива проверяется до валидации '
+            'элементов.'
+        )
@@ -0,0 +1,154 @@
+import importlib
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import get_generations
+from reviews.models import Review, Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16TopTitles:
+
+    TOP_URL = '/api/v1/titles/top/'
+
+    def add_reviews(self, django_user_model, title, scores, prefix):
+        for idx, score in enumerate(scores):
+            author = django_user_model.objects.create_user(
+                username=f'{prefix}{idx}', email=f'{prefix}{idx}@yamdb.fake'
+            )
+            Review.objects.create(
+                title=title, author=author, text='text', score=score
+            )
+
+    def test_01_bayesian_order_and_filters(self, client, admin_client,
+                                           django_user_model):
+        titles, categories, _ = create_titles(admin_client)
+        popular = Title.objects.get(pk=titles[0]['id'])
+        single = Title.objects.get(pk=titles[1]['id'])
+        Title.objects.create(name='Без отзывов', year=2000)
+        self.add_reviews(django_user_model, popular, [9] * 30, 'p')
+        self.add_reviews(django_user_model, single, [10], 's')
+
+        response = client.get(self.TOP_URL)
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert [item['id'] for item in results] == [popular.pk, single.pk], (
+            'Проверьте, что произведение с одной оценкой 10 не обгоняет '
+            'произведение с множеством оценок 9, а произведения без '
+            'отзывов не попадают в рейтинг.'
+        )
+
+        response = client.get(
+            self.TOP_URL, {'category': categories[1]['slug']}
+        )
+        assert [item['id'] for item in response.json()['results']] == [
+            single.pk
+        ]
+        response = client.get(self.TOP_URL, {'genre': 'comedy'})
+        assert [item['id'] for item in response.json()['results']] == [
+            popular.pk
+        ]
+        response = client.get(self.TOP_URL, {'year': 1988})
+        assert [item['id'] for item in response.json()['results']] == [
+            single.pk
+        ]
+
+    def test_02_ranking_follows_reviews(self, client, admin_client,
+                                        django_user_model):
+        titles, _, _ = create_titles(admin_client)
+        first = Title.objects.get(pk=titles[0]['id'])
+        second = Title.objects.get(pk=titles[1]['id'])
+        self.add_reviews(django_user_model, first, [8] * 5, 'a')
+        self.add_reviews(django_user_model, second, [7] * 5, 'b')
+        response = client.get(self.TOP_URL)
+        assert [item['id'] for item in response.json()['results']] == [
+            first.pk, second.pk
+        ]
+
+        self.add_reviews(django_user_model, second, [10] * 10, 'c')
+        response = client.get(self.TOP_URL)
+        assert [item['id'] for item in response.json()['results']] == [
+            second.pk, first.pk
+        ]
+
+    def test_03_requests_do_not_rewrite_leaderboard(self, client,
+                                                    admin_client,
+                                                    user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data={'text': 'Текст',
+                                                   'score': 8})
+            assert response.status_code == HTTPStatus.CREATED
+            assert client.get(self.TOP_URL).status_code == HTTPStatus.OK
+        full_updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_title"')
+            and 'WHERE' not in query['sql']
+        ]
+        assert not full_updates, (
+            'Проверьте, что запросы к API не пересчитывают рейтинги всех '
+            'произведений.'
+        )
+
+    def test_04_refresh_command(self, client, admin_client,
+                                django_user_model):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        self.add_reviews(django_user_model, title, [2] * 4, 'r')
+        client.get(self.TOP_URL)
+        before, = get_generations(['titles'])
+        out = StringIO()
+        call_command('refresh_leaderboard', stdout=out)
+        assert 'prior mean 2.000' in out.getvalue()
+        assert Title.objects.get_prior_mean() == 2
+        title.refresh_from_db()
+        assert title.weighted_rating == pytest.approx((8 + 10 * 2) / 14)
+        assert get_generations(['titles'])[0] > before, (
+            'Проверьте, что пересчёт рейтингов инвалидирует кэш '
+            'произведений.'
+        )
+
+    @pytest.mark.parametrize('values_path', [True, False])
+    def test_05_cursor_pages(self, client, admin_client, django_user_model,
+                             settings, values_path):
+        settings.TITLE_LIST_VALUES_PATH = values_path
+        create_titles(admin_client)
+        titles = list(Title.objects.order_by('pk')[:2]) + [
+            Title.objects.create(name='Третье', year=2000)
+        ]
+        for idx, (title, score) in enumerate(zip(titles, [6, 9, 3])):
+            self.add_reviews(django_user_model, title, [score] * 3, f'c{idx}')
+        url = f'{self.TOP_URL}?cursor=&limit=1'
+        seen = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что курсорная пагинация работает для '
+                '/titles/top/.'
+            )
+            data = response.json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        assert seen == [titles[1].pk, titles[0].pk, titles[2].pk]
+
+    def test_06_migration_fills_weighted_rating(self, django_user_model):
+        title = Title.objects.create(name='Старое', year=2000)
+        self.add_reviews(django_user_model, title, [4] * 2, 'm')
+        Title.objects.update(weighted_rating=None)
+        migration = importlib.import_module(
+            'reviews.migrations.0009_title_weighted_rating'
+        )
+        migration.fill_weighted_rating(apps, None)
+        title.refresh_from_db()
+        assert title.weighted_rating == pytest.approx((8 + 10 * 4) / 12), (
+            'Проверьте, что миграция заполняет байесовский рейтинг '
+            'существующих произведений.'
+        )
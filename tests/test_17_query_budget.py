@@ -0,0 +1,216 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.authentication import UserAccessToken
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+AUTHORS = 30
+TITLES = 40
+
+# Максимальное число SQL-запросов на маршрут и действие, включая
+# служебные BEGIN/SAVEPOINT. Пользователь берётся из claims JWT
+# без запроса к БД (см. api.authentication).
+# Списки проверяются на полной странице: limit=100 для произведений,
+# жанров и категорий, страница по умолчанию (10) для остальных.
+# Кэш ответов очищается перед каждым тестом, поэтому чтения идут в БД.
+# (имя, клиент, метод, url, данные, бюджет)
+QUERY_BUDGETS = [
+    ('genres-list', 'anonymous_client', 'get',
+     '/api/v1/genres/?limit=100',
+     None, 2),
+    ('genres-create', 'admin_client', 'post',
+     '/api/v1/genres/',
+     {'name': 'Новый жанр', 'slug': 'new-genre'}, 3),
+    ('genres-destroy', 'admin_client', 'delete',
+     '/api/v1/genres/genre-5/',
+     None, 4),
+    ('categories-list', 'anonymous_client', 'get',
+     '/api/v1/categories/?limit=100',
+     None, 2),
+    ('categories-create', 'admin_client', 'post',
+     '/api/v1/categories/',
+     {'name': 'Новая категория', 'slug': 'new-category'}, 3),
+    ('categories-destroy', 'admin_client', 'delete',
+     '/api/v1/categories/category-3/',
+     None, 5),
+    ('titles-list', 'anonymous_client', 'get',
+     '/api/v1/titles/?limit=100',
+     None, 5),
+    ('titles-list-filtered', 'anonymous_client', 'get',
+     '/api/v1/titles/?limit=100&genre=genre-1&category=category-1&name=про',
+     None, 3),
+    ('titles-top', 'anonymous_client', 'get',
+     '/api/v1/titles/top/?limit=100',
+     None, 5),
+    ('titles-retrieve', 'anonymous_client', 'get',
+     '/api/v1/titles/{title}/',
+     None, 4),
+    ('titles-create', 'admin_client', 'post',
+     '/api/v1/titles/',
+     {'name': 'Новое', 'year': 2000, 'genre': ['genre-1', 'genre-2'],
+      'category': 'category-1'}, 11),
+    ('titles-partial-update', 'admin_client', 'patch',
+     '/api/v1/titles/{title}/',
+     {'name': 'Другое'}, 7),
+    ('titles-destroy', 'admin_client', 'delete',
+     '/api/v1/titles/{title}/',
+     None, 40),
+    # Авторы страницы загружаются одним запросом (см. api.identity).
+    ('reviews-list', 'anonymous_client', 'get',
+     '/api/v1/titles/{title}/reviews/',
+     None, 4),
+    ('reviews-retrieve', 'anonymous_client', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/',
+     None, 3),
+    ('reviews-create', 'user_client', 'post',
+     '/api/v1/titles/{other_title}/reviews/',
+     {'text': 'Текст', 'score': 7}, 4),
+    ('reviews-partial-update', 'user_client', 'patch',
+     '/api/v1/titles/{title}/reviews/{own_review}/',
+     {'score': 3}, 7),
+    ('reviews-destroy', 'user_client', 'delete',
+     '/api/v1/titles/{title}/reviews/{own_review}/',
+     None, 7),
+    ('comments-list', 'anonymous_client', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/',
+     None, 4),
+    ('comments-retrieve', 'anonymous_client', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     None, 3),
+    ('comments-create', 'user_client', 'post',
+     '/api/v1/titles/{title}/reviews/{review}/comments/',
+     {'text': 'Текст'}, 2),
+    ('comments-partial-update', 'user_client', 'patch',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{own_comment}/',
+     {'text': 'Другой текст'}, 4),
+    ('comments-destroy', 'user_client', 'delete',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{own_comment}/',
+     None, 5),
+    ('users-list', 'admin_client', 'get',
+     '/api/v1/users/',
+     None, 2),
+    ('users-retrieve', 'admin_client', 'get',
+     '/api/v1/users/author1/',
+     None, 1),
+    ('users-create', 'admin_client', 'post',
+     '/api/v1/users/',
+     {'username': 'new-user', 'email': 'new-user@yamdb.fake'}, 3),
+    ('users-partial-update', 'admin_client', 'patch',
+     '/api/v1/users/author1/',
+     {'bio': 'Новое'}, 4),
+    ('users-destroy', 'admin_client', 'delete',
+     '/api/v1/users/author1/',
+     None, 13),
+    ('users-me-retrieve', 'user_client', 'get',
+     '/api/v1/users/me/',
+     None, 1),
+    ('users-me-partial-update', 'user_client', 'patch',
+     '/api/v1/users/me/',
+     {'bio': 'Новое'}, 4),
+    # Письмо только ставится в очередь (см. users.outbox), код
+    # записывается одним запросом после удаления истёкших (users.codes).
+    ('auth-signup', 'anonymous_client', 'post',
+     '/api/v1/auth/signup/',
+     {'username': 'signup-user', 'email': 'signup-user@yamdb.fake'}, 6),
+]
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {UserAccessToken.for_user(user)}'
+    )
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    """Клиент с токеном из /auth/token/, а не с токеном без claims."""
+    return token_client(admin)
+
+
+@pytest.fixture
+def user_client(user):
+    return token_client(user)
+
+
+@pytest.fixture
+def catalogue(user):
+    """Каталог реалистичного размера, созданный в обход API."""
+    Category.objects.bulk_create([
+        Category(name=f'Категория {idx}', slug=f'category-{idx}')
+        for idx in range(4)
+    ])
+    Genre.objects.bulk_create([
+        Genre(name=f'Жанр {idx}', slug=f'genre-{idx}') for idx in range(6)
+    ])
+    categories = list(Category.objects.order_by('pk'))
+    genres = list(Genre.objects.order_by('pk'))
+    titles = Title.objects.bulk_create_with_pks([
+        Title(name=f'Произведение {idx}', year=1950 + idx,
+              category=categories[idx % len(categories)])
+        for idx in range(TITLES)
+    ])
+    through = Title.genre.through
+    through.objects.bulk_create([
+        through(title_id=title.pk, genre_id=genres[(idx + shift) % 6].pk)
+        for idx, title in enumerate(titles)
+        for shift in range(2)
+    ])
+    User.objects.bulk_create([
+        User(username=f'author{idx}', email=f'author{idx}@yamdb.fake')
+        for idx in range(AUTHORS)
+    ])
+    authors = list(User.objects.filter(username__startswith='author'))
+    title = titles[0]
+    reviews = [
+        Review.objects.create(title=title, author=author, text='Текст',
+                              score=idx % 10 + 1)
+        for idx, author in enumerate(authors)
+    ]
+    for other in titles[1:]:
+        Review.objects.create(title=other, author=authors[0], text='Текст',
+                              score=8)
+    review = reviews[0]
+    Comment.objects.bulk_create([
+        Comment(review=review, author=author, text='Текст')
+        for author in authors
+    ])
+    own_review = Review.objects.create(
+        title=title, author=user, text='Свой', score=5
+    )
+    own_comment = Comment.objects.create(
+        review=review, author=user, text='Свой'
+    )
+    return {
+        'title': title.pk,
+        'other_title': titles[1].pk,
+        'review': review.pk,
+        'comment': Comment.objects.filter(review=review).first().pk,
+        'own_review': own_review.pk,
+        'own_comment': own_comment.pk,
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize(
+    'name, client_name, method, url, data, budget', QUERY_BUDGETS,
+    ids=[case[0] for case in QUERY_BUDGETS]
+)
+def test_query_budget(name, client_name, method, url, data, budget,
+                      catalogue, query_budget, request, settings):
+    settings.EMAIL_OUTBOX_EAGER = False
+    client = request.getfixturevalue(client_name)
+    url = url.format(**catalogue)
+    with query_budget(name, budget):
+        response = getattr(client, method)(url, data=data, format='json')
+    assert response.status_code < 400, (
+        f'Запрос `{name}` к `{url}` завершился ошибкой '
+        f'{response.status_code}: {response.content[:200]}'
+    )
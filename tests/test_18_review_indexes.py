@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def list_query_plans(client, url, table):
+    """Планы выборок страницы из таблицы, выполненных эндпоинтом."""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Запрос к `{url}` завершился ошибкой {response.status_code}.'
+    )
+    plans = [
+        explain(query['sql']) for query in queries.captured_queries
+        if query['sql'].startswith('SELECT')
+        and f'FROM "{table}"' in query['sql']
+        and 'ORDER BY' in query['sql']
+    ]
+    assert plans, f'Эндпоинт `{url}` не выбирал строки из `{table}`.'
+    return plans
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite',
+                    reason='План запроса проверяется только на SQLite.')
+@pytest.mark.django_db(transaction=True)
+class Test18ReviewIndexes:
+
+    @pytest.fixture
+    def review(self, user, django_user_model):
+        title = Title.objects.create(name='Произведение', year=2000)
+        other = Title.objects.create(name='Другое', year=2001)
+        for idx in range(5):
+            author = django_user_model.objects.create_user(
+                username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+            )
+            Review.objects.create(title=title, author=author, text='Текст',
+                                  score=idx + 1)
+            Review.objects.create(title=other, author=author, text='Текст',
+                                  score=idx + 1)
+        review = Review.objects.create(title=title, author=user,
+                                       text='Свой', score=5)
+        for idx in range(5):
+            Comment.objects.create(review=review, author=user, text='Текст')
+        return review
+
+    @pytest.mark.parametrize('query', ['', '?cursor=', '?limit=2&offset=2'])
+    def test_01_reviews_list_uses_index(self, client, review, query):
+        url = f'/api/v1/titles/{review.title_id}/reviews/{query}'
+        for plan in list_query_plans(client, url, 'reviews_review'):
+            assert 'review_title_pub_date_idx' in plan, (
+                'Проверьте, что список отзывов читается по индексу '
+                f'(title, pub_date, id). План: {plan}'
+            )
+            assert 'TEMP B-TREE' not in plan, (
+                'Проверьте, что список отзывов не сортируется во временном '
+                f'B-дереве. План: {plan}'
+            )
+
+    @pytest.mark.parametrize('query', ['', '?cursor=', '?limit=2&offset=2'])
+    def test_02_comments_list_uses_index(self, client, review, query):
+        url = (
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/'
+            f'comments/{query}'
+        )
+        for plan in list_query_plans(client, url, 'reviews_comment'):
+            assert 'comment_review_pub_date_idx' in plan, (
+                'Проверьте, что список комментариев читается по индексу '
+                f'(review, pub_date, id). План: {plan}'
+            )
+            assert 'TEMP B-TREE' not in plan, (
+                'Проверьте, что список комментариев не сортируется во '
+                f'временном B-дереве. План: {plan}'
+            )
+
+    def test_03_author_index(self, user, review):
+        for model, index in ((Review, 'review_author_pub_date_idx'),
+                             (Comment, 'comment_author_pub_date_idx')):
+            queryset = model.objects.filter(author=user).order_by('-pub_date')
+            plan = explain(str(queryset.query))
+            assert index in plan and 'TEMP B-TREE' not in plan, (
+                f'Проверьте, что выборка {model.__name__} по автору '
+                f'использует индекс {index}. План: {plan}'
+            )
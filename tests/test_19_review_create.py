@@ -0,0 +1,41 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19ReviewCreate:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def test_01_duplicate_review_rejected_by_constraint(self, user,
+                                                       user_client):
+        title = Title.objects.create(name='Произведение', year=2000)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.pk)
+        response = user_client.post(url, data={'text': 'Раз', 'score': 8})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['author'] == user.username
+
+        response = user_client.post(url, data={'text': 'Два', 'score': 1})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {
+            'non_field_errors': ['Вы уже оставляли отзыв на это произведение.']
+        }, (
+            'Проверьте, что повторный отзыв отклоняется с прежним текстом '
+            'ошибки.'
+        )
+        title.refresh_from_db()
+        assert Review.objects.filter(title=title).count() == 1
+        assert (title.review_count, title.score_sum) == (1, 8), (
+            'Проверьте, что отклонённый отзыв не меняет агрегаты рейтинга.'
+        )
+
+    def test_02_missing_title_before_validation(self, user_client):
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=404)
+        response = user_client.post(url, data={})
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что для несуществующего произведения POST-запрос '
+            'возвращает 404, даже если данные невалидны.'
+        )
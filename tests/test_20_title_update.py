@@ -0,0 +1,74 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20TitleUpdate:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    def patch(self, admin_client, title_id, data):
+        response = admin_client.patch(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id),
+            data=data, format='json'
+        )
+        assert response.status_code == HTTPStatus.OK, response.content
+        return response.json()
+
+    def test_01_patch_keeps_untouched_relations(self, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        title = titles[0]
+        data = self.patch(admin_client, title['id'], {'name': 'Другое'})
+        assert data['name'] == 'Другое'
+        assert sorted(item['slug'] for item in data['genre']) == sorted(
+            title['genre']
+        ), 'Проверьте, что PATCH без genre не меняет жанры произведения.'
+        assert data['category']['slug'] == title['category'], (
+            'Проверьте, что PATCH без category не сбрасывает категорию.'
+        )
+        stored = Title.objects.get(pk=title['id'])
+        assert stored.category.slug == title['category']
+        assert stored.genre.count() == len(title['genre'])
+
+    def test_02_genre_diff(self, admin_client):
+        titles, _, genres = create_titles(admin_client)
+        title = titles[0]
+        wanted = [title['genre'][0], genres[2]['slug']]
+        through = Title.genre.through
+        kept = through.objects.get(
+            title_id=title['id'], genre__slug=title['genre'][0]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            data = self.patch(admin_client, title['id'], {'genre': wanted})
+        assert sorted(item['slug'] for item in data['genre']) == sorted(
+            wanted
+        )
+        assert through.objects.filter(pk=kept.pk).exists(), (
+            'Проверьте, что неизменившиеся связи с жанрами не пересоздаются.'
+        )
+        assert not any(
+            query['sql'].startswith('UPDATE "reviews_title"')
+            for query in queries.captured_queries
+        ), 'Проверьте, что смена жанров не сохраняет поля произведения.'
+
+    def test_03_patch_updates_only_changed_fields(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        title = titles[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.patch(admin_client, title['id'], {
+                'name': title['name'], 'year': 1990
+            })
+        updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_title"')
+        ]
+        assert updates == [
+            'UPDATE "reviews_title" SET "year" = 1990 '
+            f'WHERE "reviews_title"."id" = {title["id"]}'
+        ], 'Проверьте, что PATCH сохраняет только изменившиеся поля.'
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.utils import timezone
+
+from reviews.models import Comment, Review, Title
+from tests.utils import create_titles
+
+
+def read_ndjson(response):
+    content = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+def read_csv(response):
+    content = b''.join(response.streaming_content).decode()
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21Export:
+
+    EXPORT_URL_TEMPLATE = '/api/v1/export/{resource}/'
+
+    @pytest.fixture
+    def reviews(self, admin_client, user, admin):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        old = Review.objects.create(title=title, author=admin,
+                                    text='Старый', score=4)
+        Review.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        new = Review.objects.create(title=title, author=user,
+                                    text='Новый', score=9)
+        Comment.objects.create(review=new, author=admin, text='Согласен')
+        return titles, old, new
+
+    @pytest.mark.parametrize('resource', ['titles', 'reviews', 'comments'])
+    def test_01_admin_only(self, client, user_client, resource):
+        url = self.EXPORT_URL_TEMPLATE.format(resource=resource)
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что выгрузка доступна только администратору.'
+        )
+
+    def test_02_titles_ndjson(self, admin_client, reviews):
+        titles, _, _ = reviews
+        response = admin_client.get(
+            self.EXPORT_URL_TEMPLATE.format(resource='titles')
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдаётся потоковым ответом.'
+        )
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = read_ndjson(response)
+        assert [row['id'] for row in rows] == [
+            title['id'] for title in titles
+        ]
+        first = rows[0]
+        assert first['name'] == titles[0]['name']
+        assert first['category'] == titles[0]['category']
+        assert first['genre'] == sorted(titles[0]['genre'])
+        assert first['review_count'] == 2
+        assert first['rating'] == 6.5
+
+    def test_03_reviews_csv_since(self, admin_client, reviews):
+        _, old, new = reviews
+        url = self.EXPORT_URL_TEMPLATE.format(resource='reviews')
+        response = admin_client.get(url, {'format': 'csv'})
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/csv')
+        rows = read_csv(response)
+        assert [int(row['id']) for row in rows] == [old.pk, new.pk]
+        assert rows[1]['author'] == new.author.username
+
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = read_ndjson(admin_client.get(url, {'since': since}))
+        assert [row['id'] for row in rows] == [new.pk], (
+            'Проверьте, что параметр since отбрасывает более ранние записи.'
+        )
+
+        response = admin_client.get(url, {'since': 'вчера'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_04_comments_and_errors(self, admin_client, reviews):
+        _, _, new = reviews
+        rows = read_ndjson(admin_client.get(
+            self.EXPORT_URL_TEMPLATE.format(resource='comments')
+        ))
+        assert len(rows) == 1
+        assert rows[0]['review_id'] == new.pk
+        assert rows[0]['title_id'] == new.title_id
+        response = admin_client.get(
+            self.EXPORT_URL_TEMPLATE.format(resource='titles'),
+            {'since': timezone.now().isoformat()}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = admin_client.get(
+            self.EXPORT_URL_TEMPLATE.format(resource='users')
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_05_snapshot_feeds_next_export(self, admin_client, reviews,
+                                           user_superuser):
+        titles, old, new = reviews
+        url = self.EXPORT_URL_TEMPLATE.format(resource='reviews')
+        response = admin_client.get(url)
+        snapshot = response['X-Export-Snapshot']
+        assert [row['id'] for row in read_ndjson(response)] == [
+            old.pk, new.pk
+        ]
+        later = Review.objects.create(
+            title_id=titles[1]['id'], author=user_superuser, text='Позже',
+            score=5
+        )
+        rows = read_ndjson(admin_client.get(url, {'since': snapshot}))
+        assert [row['id'] for row in rows] == [later.pk], (
+            'Проверьте, что X-Export-Snapshot фиксируется внутри '
+            'транзакции выгрузки и подходит для следующей выгрузки.'
+        )
+
+
+@pytest.mark.django_db
+def test_sqlite_file_database_uses_wal(tmp_path):
+    wrapper = DatabaseWrapper({
+        **connection.settings_dict, 'NAME': str(tmp_path / 'db.sqlite3')
+    })
+    try:
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            mode, = cursor.fetchone()
+    finally:
+        wrapper.close()
+    assert mode == 'wal', (
+        'Проверьте, что для файловой SQLite включается журнал WAL, '
+        'чтобы выгрузка не блокировала запись.'
+    )
@@ -0,0 +1,244 @@
+import csv
+import gzip
+import os
+import shutil
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import UserAccessToken
+from reviews.importing import IMPORT_SPECS, import_levels
+from reviews.models import Comment, Genre, Review, Title
+from users.models import User
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+
+def run_import(path, **options):
+    out = StringIO()
+    call_command('import_csv', path=str(path), stdout=out, **options)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ImportCsv:
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_01_imports_fixture_data(self, client, workers):
+        output = run_import(DATA_DIR, batch_size=7, workers=workers)
+        assert 'rows/s' in output and 'write ' in output, (
+            'Проверьте, что команда сообщает скорость и время по этапам.'
+        )
+        assert Title.objects.count() == 32
+        assert Review.objects.count() == 72
+        assert Comment.objects.count() == 3
+        assert Title.genre.through.objects.count() == 42
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что дата публикации берётся из файла.'
+        )
+        title = Title.objects.get(pk=review.title_id)
+        scores = list(title.reviews.values_list('score', flat=True))
+        assert title.review_count == len(scores)
+        assert title.rating == pytest.approx(sum(scores) / len(scores)), (
+            'Проверьте, что после импорта пересчитываются рейтинги.'
+        )
+        response = client.get('/api/v1/titles/', {'name': 'шоушенк'})
+        assert [item['id'] for item in response.json()['results']] == [1], (
+            'Проверьте, что после импорта перестраивается поисковый индекс.'
+        )
+
+    def test_02_reimport_upserts_gzip(self, tmp_path):
+        run_import(DATA_DIR)
+        for name in os.listdir(DATA_DIR):
+            source = os.path.join(DATA_DIR, name)
+            if name == 'genre.csv':
+                with open(source, encoding='utf-8') as file:
+                    content = file.read().replace('Драма', 'Драма (new)')
+                with gzip.open(tmp_path / f'{name}.gz', 'wt',
+                               encoding='utf-8') as file:
+                    file.write(content)
+            else:
+                shutil.copy(source, tmp_path / name)
+        user = User.objects.get(pk=100)
+        user.is_staff = True
+        user.save()
+
+        run_import(tmp_path)
+        assert Genre.objects.get(slug='drama').name == 'Драма (new)', (
+            'Проверьте, что повторный импорт обновляет изменённые строки '
+            'и читает файлы .csv.gz.'
+        )
+        assert Genre.objects.count() == 15
+        assert Review.objects.count() == 72
+        assert User.objects.get(pk=100).is_staff, (
+            'Проверьте, что импорт не перезаписывает поля, которых нет '
+            'в файле.'
+        )
+
+    def test_03_reports_bad_rows(self, tmp_path):
+        (tmp_path / 'category.csv').write_text(
+            'id,name,slug\n1,Фильм,movie\n2,Книга,movie\n',
+            encoding='utf-8'
+        )
+        (tmp_path / 'titles.csv').write_text(
+            'id,name,year,category\n1,Первое,1990,1\n2,Второе,год,1\n'
+            '3,Третье,1990,7\n',
+            encoding='utf-8'
+        )
+        output = run_import(tmp_path)
+        assert output.count('Error importing row') == 3, output
+        assert list(Title.objects.values_list('pk', flat=True)) == [1]
+
+    def test_04_import_revokes_demoted_role(self, tmp_path):
+        shutil.copy(os.path.join(DATA_DIR, 'users.csv'), tmp_path)
+        run_import(tmp_path)
+        admin = User.objects.get(username='capt_obvious')
+        assert admin.role == 'admin'
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {UserAccessToken.for_user(admin)}'
+        )
+        assert client.get('/api/v1/users/').status_code == HTTPStatus.OK
+
+        users_csv = tmp_path / 'users.csv'
+        users_csv.write_text(
+            users_csv.read_text(encoding='utf-8').replace(
+                'capt_obvious@yamdb.fake,admin', 'capt_obvious@yamdb.fake,user'
+            ),
+            encoding='utf-8'
+        )
+        run_import(tmp_path)
+        assert client.get('/api/v1/users/').status_code == (
+            HTTPStatus.FORBIDDEN
+        ), 'Проверьте, что импорт пользователей обновляет выданные токены.'
+
+
+def test_import_levels():
+    levels = [
+        sorted(spec.file for spec in level)
+        for level in import_levels(IMPORT_SPECS)
+    ]
+    assert levels == [
+        ['category.csv', 'genre.csv', 'users.csv'],
+        ['titles.csv'],
+        ['genre_title.csv', 'review.csv'],
+        ['comments.csv'],
+    ], 'Проверьте порядок импорта по графу внешних ключей.'
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22IncrementalImport:
+
+    def copy_data(self, target):
+        target.mkdir()
+        for name in os.listdir(DATA_DIR):
+            shutil.copy(os.path.join(DATA_DIR, name), target / name)
+        return target
+
+    def rewrite(self, path, transform):
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        fieldnames = list(rows[0])
+        rows = transform(rows)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def test_01_only_changed_rows_are_written(self, tmp_path):
+        data = self.copy_data(tmp_path / 'data')
+        manifest = tmp_path / 'manifest.json.gz'
+        options = {'incremental': True, 'manifest': str(manifest)}
+        run_import(data, **options)
+        assert manifest.exists()
+
+        def change_review(rows):
+            for row in rows:
+                if row['id'] == '1':
+                    row['score'] = '1'
+            return rows
+
+        self.rewrite(data / 'review.csv', change_review)
+        Genre.objects.filter(slug='drama').update(name='Изменено вручную')
+        output = run_import(data, **options)
+        assert 'imported 1 rows into Review' in output, output
+        assert 'imported 0 rows into Genre' in output, output
+        assert Genre.objects.get(slug='drama').name == 'Изменено вручную', (
+            'Проверьте, что неизменённые строки файла не перезаписываются.'
+        )
+        review = Review.objects.get(pk=1)
+        assert review.score == 1
+        title = Title.objects.get(pk=review.title_id)
+        scores = list(title.reviews.values_list('score', flat=True))
+        assert title.rating == pytest.approx(sum(scores) / len(scores)), (
+            'Проверьте, что рейтинг пересчитывается для изменённых отзывов.'
+        )
+
+    def test_02_delete_missing(self, tmp_path):
+        data = self.copy_data(tmp_path / 'data')
+        options = {
+            'incremental': True,
+            'manifest': str(tmp_path / 'manifest.json.gz'),
+        }
+        run_import(data, **options)
+        title_id = Review.objects.get(pk=1).title_id
+        self.rewrite(data / 'review.csv', lambda rows: [
+            row for row in rows if row['id'] != '1'
+        ])
+        self.rewrite(data / 'comments.csv', lambda rows: rows[1:])
+
+        run_import(data, **options)
+        assert Review.objects.filter(pk=1).exists(), (
+            'Проверьте, что без --delete-missing строки не удаляются.'
+        )
+        output = run_import(data, delete_missing=True, **options)
+        assert 'Deleted 1 rows missing from review.csv' in output, output
+        assert not Review.objects.filter(pk=1).exists()
+        assert Comment.objects.count() == 2
+        title = Title.objects.get(pk=title_id)
+        assert title.review_count == title.reviews.count()
+
+    def test_03_delete_missing_requires_incremental(self, tmp_path):
+        with pytest.raises(CommandError):
+            run_import(DATA_DIR, delete_missing=True)
+
+    def test_04_incremental_run_updates_only_touched_titles(self, tmp_path):
+        data = self.copy_data(tmp_path / 'data')
+        options = {
+            'incremental': True,
+            'manifest': str(tmp_path / 'manifest.json.gz'),
+        }
+        run_import(data, **options)
+
+        def change_review(rows):
+            for row in rows:
+                if row['id'] == '1':
+                    row['score'] = '2'
+            return rows
+
+        self.rewrite(data / 'review.csv', change_review)
+        prior_mean = Title.objects.get_prior_mean()
+        with CaptureQueriesContext(connection) as context:
+            run_import(data, **options)
+        full_updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_title"')
+            and 'WHERE' not in query['sql']
+        ]
+        assert not full_updates, (
+            'Проверьте, что инкрементальный импорт не переписывает '
+            'рейтинги всех произведений.'
+        )
+        title = Title.objects.get(pk=Review.objects.get(pk=1).title_id)
+        weight = settings.LEADERBOARD_PRIOR_WEIGHT
+        assert title.weighted_rating == pytest.approx(
+            (title.score_sum + weight * prior_mean)
+            / (title.review_count + weight)
+        ), 'Проверьте, что рейтинг затронутого произведения обновлён.'
@@ -0,0 +1,81 @@
+import csv
+import gzip
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from reviews.importing import IMPORT_SPECS
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+MODELS = (User, Category, Genre, Title, Title.genre.through, Review, Comment)
+
+
+def snapshot():
+    """Содержимое колонок файлов; id связей и служебные поля не важны."""
+    return {
+        spec.file: sorted(spec.model.objects.values_list(*(
+            spec.get_field(column).attname for column in spec.columns
+        )))
+        for spec in IMPORT_SPECS
+    }
+
+
+def clear_database():
+    for model in reversed(MODELS):
+        model.objects.all().delete()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23ExportCsv:
+
+    def test_01_layout_matches_import(self, tmp_path):
+        call_command('import_csv', path=DATA_DIR, stdout=StringIO())
+        call_command('export_csv', path=str(tmp_path), stdout=StringIO())
+        for name in os.listdir(DATA_DIR):
+            with open(os.path.join(DATA_DIR, name), encoding='utf-8') as f:
+                source_header = next(csv.reader(f))
+            with open(tmp_path / name, encoding='utf-8') as f:
+                header = next(csv.reader(f))
+            assert set(source_header) <= set(header), (
+                f'Проверьте, что выгрузка {name} содержит все колонки '
+                'исходного файла.'
+            )
+        with open(tmp_path / 'review.csv', encoding='utf-8') as f:
+            assert sum(1 for _ in csv.DictReader(f)) == Review.objects.count()
+
+    def test_02_round_trip_gzip_shards(self, tmp_path):
+        call_command('import_csv', path=DATA_DIR, stdout=StringIO())
+        expected = snapshot()
+        out = StringIO()
+        call_command('export_csv', path=str(tmp_path), gzip=True,
+                     shard_size=10, stdout=out)
+        assert 'rows/s' in out.getvalue()
+        assert (tmp_path / 'review.00008.csv.gz').exists(), (
+            'Проверьте, что выгрузка делится на части по --shard-size.'
+        )
+        with gzip.open(tmp_path / 'review.00001.csv.gz', 'rt',
+                       encoding='utf-8') as f:
+            assert sum(1 for _ in csv.DictReader(f)) == 10
+
+        clear_database()
+        call_command('import_csv', path=str(tmp_path), stdout=StringIO())
+        assert snapshot() == expected, (
+            'Проверьте, что выгрузка export_csv загружается import_csv '
+            'без потерь.'
+        )
+
+    def test_03_reexport_replaces_old_shards(self, tmp_path):
+        call_command('import_csv', path=DATA_DIR, stdout=StringIO())
+        call_command('export_csv', path=str(tmp_path), shard_size=10,
+                     stdout=StringIO())
+        Comment.objects.all().delete()
+        call_command('export_csv', path=str(tmp_path), stdout=StringIO())
+        assert sorted(
+            name for name in os.listdir(tmp_path)
+            if name.startswith('comments')
+        ) == ['comments.csv']
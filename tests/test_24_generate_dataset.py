@@ -0,0 +1,120 @@
+import os
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.importing import IMPORT_SPECS
+from reviews.models import Comment, Review, Title
+from reviews.synthetic import DatasetGenerator
+from users.models import User
+
+SIZES = dict(users=60, categories=4, genres=8, titles=120, reviews=900,
+             comments=150)
+
+
+def read_files(path):
+    files = {}
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), 'rb') as f:
+            files[name] = f.read()
+    return files
+
+
+class Test24DatasetGenerator:
+
+    def test_01_same_seed_same_rows(self):
+        for spec in IMPORT_SPECS:
+            first = list(DatasetGenerator(seed=7, **SIZES).rows(spec))
+            second = list(DatasetGenerator(seed=7, **SIZES).rows(spec))
+            assert first == second, (
+                f'Проверьте, что {spec.file} воспроизводится при том же seed.'
+            )
+        reviews_spec = next(s for s in IMPORT_SPECS if s.model is Review)
+        assert list(DatasetGenerator(seed=7, **SIZES).rows(reviews_spec)) != (
+            list(DatasetGenerator(seed=8, **SIZES).rows(reviews_spec))
+        ), 'Проверьте, что другой seed даёт другие данные.'
+
+    def test_02_reviews_are_skewed_and_unique(self):
+        generator = DatasetGenerator(seed=1, **SIZES)
+        reviews = list(generator.reviews())
+        pairs = [(row['title_id'], row['author_id']) for row in reviews]
+        assert len(pairs) == len(set(pairs)), (
+            'Проверьте, что автор пишет не больше одного отзыва '
+            'на произведение.'
+        )
+        per_title = sorted(
+            Counter(row['title_id'] for row in reviews).values(),
+            reverse=True,
+        )
+        top = sum(per_title[:len(per_title) // 10])
+        assert top > len(reviews) * 0.3, (
+            'Проверьте, что 10% популярных произведений собирают '
+            'заметную долю отзывов.'
+        )
+        assert all(1 <= row['score'] <= 10 for row in reviews)
+
+    def test_03_reviews_over_cap_are_redistributed(self):
+        sizes = dict(SIZES, users=10, titles=50, reviews=400)
+        generator = DatasetGenerator(seed=1, **sizes)
+        counts = generator.review_counts()
+        assert sum(counts) == sizes['reviews'], (
+            'Проверьте, что отзывы сверх числа пользователей '
+            'переносятся на другие произведения, а не теряются.'
+        )
+        assert max(counts) <= sizes['users']
+        assert sum(1 for _ in generator.reviews()) == sizes['reviews']
+        with pytest.raises(ValueError):
+            DatasetGenerator(
+                seed=1, **dict(sizes, reviews=501)
+            ).review_counts()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24GenerateDatasetCommand:
+
+    def test_01_csv_is_reproducible_and_importable(self, tmp_path):
+        first, second = tmp_path / 'first', tmp_path / 'second'
+        for path in (first, second):
+            call_command('generate_dataset', path=str(path), seed=3,
+                         stdout=StringIO(), **SIZES)
+        assert read_files(first) == read_files(second), (
+            'Проверьте, что CSV при том же seed совпадают побайтно.'
+        )
+        expected = sum(
+            1 for _ in DatasetGenerator(seed=3, **SIZES).reviews()
+        )
+        out = StringIO()
+        call_command('import_csv', path=str(first), workers=1, stdout=out)
+        assert 'failed' not in out.getvalue(), out.getvalue()
+        assert Review.objects.count() == expected
+        assert Comment.objects.count() == SIZES['comments']
+        assert Title.objects.filter(review_count__gt=0).exists(), (
+            'Проверьте, что рейтинги пересчитаны после импорта.'
+        )
+
+    def test_02_db_output(self):
+        out = StringIO()
+        call_command('generate_dataset', output='db', seed=3,
+                     stdout=out, **SIZES)
+        assert 'rows/s' in out.getvalue()
+        assert User.objects.count() == SIZES['users']
+        title = Title.objects.filter(review_count__gt=0).first()
+        assert title.rating is not None, (
+            'Проверьте, что --output db пересчитывает рейтинги.'
+        )
+        with pytest.raises(CommandError):
+            call_command('generate_dataset', output='db', stdout=StringIO(),
+                         **SIZES)
+
+    def test_03_csv_requires_path(self):
+        with pytest.raises(CommandError):
+            call_command('generate_dataset', stdout=StringIO())
+
+    def test_04_unreachable_reviews_total(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command('generate_dataset', path=str(tmp_path),
+                         stdout=StringIO(),
+                         **dict(SIZES, users=2, titles=3, reviews=7))
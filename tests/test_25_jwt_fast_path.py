@@ -0,0 +1,183 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import TokenLRU, UserAccessToken, verified_tokens
+from api.cache import bump_generation, user_auth
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_verified_tokens():
+    verified_tokens.clear()
+    yield
+    verified_tokens.clear()
+
+
+def client_for(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    return client_for(UserAccessToken.for_user(admin))
+
+
+@pytest.fixture
+def user_client(user):
+    return client_for(UserAccessToken.for_user(user))
+
+
+def user_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'users_user' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25JwtFastPath:
+
+    GENRES_URL = '/api/v1/genres/'
+
+    def test_01_issued_token_skips_user_select(self, user):
+        code = user.set_new_confirmation_code()
+        response = APIClient().post('/api/v1/auth/token/', data={
+            'username': user.username,
+            'confirmation_code': code,
+        })
+        assert response.status_code == HTTPStatus.OK
+        client = client_for(response.json()['token'])
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                response = client.post(self.GENRES_URL, data={
+                    'name': 'Жанр', 'slug': 'genre'
+                })
+            assert response.status_code == HTTPStatus.FORBIDDEN
+            assert not user_queries(context), (
+                'Проверьте, что пользователь с токеном из /auth/token/ '
+                'не загружается из БД.'
+            )
+
+    def test_02_role_change_applies_to_issued_token(self, user, user_client,
+                                                    admin_client):
+        data = {'name': 'Жанр', 'slug': 'genre'}
+        response = user_client.post(self.GENRES_URL, data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = user_client.post(self.GENRES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что смена роли действует на уже выданный токен.'
+        )
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'user'}
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                self.GENRES_URL, data={'name': 'Ещё', 'slug': 'other'}
+            )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что понижение роли действует на выданный токен.'
+        )
+        assert len(user_queries(context)) == 1
+
+    def test_03_deleted_user_rejected(self, user, user_client, admin_client):
+        assert user_client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.OK
+        )
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удалённого пользователя отклоняется.'
+        )
+
+    def test_04_last_login_keeps_version(self, user, user_client):
+        user_client.get('/api/v1/users/me/')
+        user.save(update_fields=['last_login'])
+        with CaptureQueriesContext(connection) as context:
+            user_client.post(self.GENRES_URL, data={})
+        assert not user_queries(context), (
+            'Проверьте, что обновление last_login не сбрасывает токены.'
+        )
+
+    def test_05_legacy_token_checked_once(self, moderator):
+        client = client_for(AccessToken.for_user(moderator))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['role'] == 'moderator'
+        assert len(user_queries(context)) == 2
+        with CaptureQueriesContext(connection) as context:
+            client.post(self.GENRES_URL, data={})
+        assert not user_queries(context), (
+            'Проверьте, что токен без claims проверяется по БД один раз.'
+        )
+
+    def test_06_process_local_cache_falls_back_to_db(self, settings,
+                                                      user_client):
+        settings.RESPONSE_CACHE_ALIAS = 'default'
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                user_client.post(self.GENRES_URL, data={})
+            assert len(user_queries(context)) == 1, (
+                'Проверьте, что без общего кэша версий пользователь '
+                'читается из БД на каждый запрос.'
+            )
+
+    def test_07_invalid_token_rejected(self):
+        response = client_for('not-a-token').get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_08_role_change_while_issuing_token(self, admin):
+        code = admin.set_new_confirmation_code()
+
+        def demote(sender, instance, **kwargs):
+            # Другой процесс понижает роль сразу после загрузки
+            # пользователя для выдачи токена.
+            post_init.disconnect(demote, sender=User)
+            User.objects.filter(pk=instance.pk).update(role='user')
+            bump_generation(user_auth(instance.pk))
+
+        post_init.connect(demote, sender=User)
+        try:
+            response = APIClient().post('/api/v1/auth/token/', data={
+                'username': admin.username,
+                'confirmation_code': code,
+            })
+        finally:
+            post_init.disconnect(demote, sender=User)
+        assert response.status_code == HTTPStatus.OK
+        client = client_for(response.json()['token'])
+        response = client.post(self.GENRES_URL, data={
+            'name': 'Жанр', 'slug': 'genre'
+        })
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что версия пользователя для токена читается '
+            'до загрузки пользователя.'
+        )
+
+
+def test_token_lru_is_bounded():
+    lru = TokenLRU(maxsize=2)
+    lru.set(b'a', 1)
+    lru.set(b'b', 2)
+    assert lru.get(b'a') == 1
+    lru.set(b'c', 3)
+    assert len(lru) == 2
+    assert lru.get(b'b') is None, (
+        'Проверьте, что вытесняется давно не использованный токен.'
+    )
+    assert lru.get(b'a') == 1 and lru.get(b'c') == 3
@@ -0,0 +1,139 @@
+import socketserver
+import threading
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from users.models import OutboundEmail
+from users.outbox import enqueue_email
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает письма и запоминает их."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost ready')
+        for line in self.rfile:
+            command = line.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif verb == 'RCPT' and any(
+                address in command for address in server.rejected
+            ):
+                self.reply('550 mailbox unavailable')
+            elif verb == 'DATA':
+                self.reply('354 end with .')
+                data = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                server.messages.append(data.decode())
+                self.reply('250 queued')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                break
+            else:
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = []
+    server.rejected = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = server.server_address[1]
+    settings.EMAIL_USE_SSL = False
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_HOST_USER = ''
+    settings.EMAIL_HOST_PASSWORD = ''
+    settings.DEFAULT_FROM_EMAIL = 'noreply@yamdb.fake'
+    settings.EMAIL_OUTBOX_EAGER = False
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def deliver_outbox():
+    out = StringIO()
+    call_command('deliver_outbox', stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26EmailOutbox:
+
+    def test_01_signup_only_enqueues(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+        settings.EMAIL_HOST = '127.0.0.1'
+        settings.EMAIL_PORT = 9
+        data = {'email': 'queued@yamdb.fake', 'username': 'queued'}
+        response = client.post('/api/v1/auth/signup/', data=data)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что регистрация не обращается к почтовому серверу.'
+        )
+        assert mail.outbox == []
+        email = OutboundEmail.objects.get()
+        assert email.recipient == data['email']
+        assert email.sent_at is None
+
+    def test_02_worker_reuses_connection(self, smtp_server):
+        for idx in range(5):
+            enqueue_email('Тема', f'Письмо {idx}', f'user{idx}@yamdb.fake')
+        assert smtp_server.messages == []
+        assert 'Sent 5 emails.' in deliver_outbox()
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 1, (
+            'Проверьте, что воркер отправляет пачку через одно соединение.'
+        )
+        assert not OutboundEmail.objects.filter(sent_at=None).exists()
+        assert 'Sent 0 emails.' in deliver_outbox(), (
+            'Проверьте, что отправленные письма не отправляются повторно.'
+        )
+
+    def test_03_failed_delivery_is_retried(self, smtp_server, settings):
+        smtp_server.rejected.add('bad@yamdb.fake')
+        enqueue_email('Тема', 'Письмо', 'bad@yamdb.fake')
+        enqueue_email('Тема', 'Письмо', 'good@yamdb.fake')
+        output = deliver_outbox()
+        assert 'Sent 1 emails. 1 failed' in output
+        bad = OutboundEmail.objects.get(recipient='bad@yamdb.fake')
+        assert (bad.attempts, bad.sent_at, bad.failed) == (1, None, False)
+        assert bad.next_attempt_at > timezone.now(), (
+            'Проверьте, что неудачное письмо откладывается.'
+        )
+        assert 'SMTPRecipientsRefused' in bad.last_error
+        assert 'Sent 0 emails.' in deliver_outbox()
+
+        smtp_server.rejected.clear()
+        OutboundEmail.objects.filter(pk=bad.pk).update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        assert 'Sent 1 emails.' in deliver_outbox()
+        bad.refresh_from_db()
+        assert bad.sent_at is not None and bad.attempts == 2
+
+    def test_04_gives_up_after_max_attempts(self, smtp_server, settings):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 1
+        smtp_server.rejected.add('bad@yamdb.fake')
+        enqueue_email('Тема', 'Письмо', 'bad@yamdb.fake')
+        deliver_outbox()
+        bad = OutboundEmail.objects.get()
+        assert bad.failed, (
+            'Проверьте, что после EMAIL_OUTBOX_MAX_ATTEMPTS письмо '
+            'помечается failed.'
+        )
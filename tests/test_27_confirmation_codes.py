@@ -0,0 +1,101 @@
+import re
+import time
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.codes import code_key
+from users.models import ConfirmationCode
+
+URL_SIGNUP = '/api/v1/auth/signup/'
+URL_TOKEN = '/api/v1/auth/token/'
+SIGNUP_DATA = {'email': 'codes@yamdb.fake', 'username': 'codes'}
+
+
+def signup(client):
+    response = client.post(URL_SIGNUP, data=SIGNUP_DATA)
+    assert response.status_code == HTTPStatus.OK
+    return re.search(r'\d{6}', mail.outbox[-1].body).group()
+
+
+def obtain_token(client, code):
+    return client.post(URL_TOKEN, data={
+        'username': SIGNUP_DATA['username'], 'confirmation_code': code
+    })
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27ConfirmationCodes:
+
+    def test_01_code_is_single_use(self, client):
+        code = signup(client)
+        wrong_code = str((int(code) + 1) % 10 ** 6).zfill(6)
+        response = obtain_token(client, wrong_code)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = obtain_token(client, code)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что неверная попытка не гасит действующий код.'
+        )
+        assert 'token' in response.json()
+        assert obtain_token(client, code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        ), 'Проверьте, что код подтверждения нельзя использовать дважды.'
+
+    def test_02_new_code_replaces_old(self, client):
+        old_code = signup(client)
+        new_code = signup(client)
+        if old_code != new_code:
+            assert obtain_token(client, old_code).status_code == (
+                HTTPStatus.BAD_REQUEST
+            ), 'Проверьте, что новый код отменяет прежний.'
+        assert obtain_token(client, new_code).status_code == HTTPStatus.OK
+
+    def test_03_code_expires(self, client, settings):
+        settings.CONFIRMATION_CODE_TIMEOUT = 1
+        code = signup(client)
+        time.sleep(1.1)
+        assert obtain_token(client, code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        ), 'Проверьте, что код подтверждения истекает.'
+
+    def test_04_signup_retry_does_not_write_users(self, client):
+        signup(client)
+        with CaptureQueriesContext(connection) as context:
+            signup(client)
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if 'users_user' in query['sql']
+            and not query['sql'].startswith('SELECT')
+        ]
+        assert writes == [], (
+            'Проверьте, что повторная регистрация не пишет в таблицу '
+            'пользователей.'
+        )
+
+    def test_05_code_survives_response_cache_churn(self, client):
+        code = signup(client)
+        for idx in range(400):
+            client.get('/api/v1/genres/', {'search': idx})
+        assert ConfirmationCode.objects.filter(
+            key=code_key(SIGNUP_DATA['username'])
+        ).exists(), 'Проверьте, что коды подтверждения хранятся в БД.'
+        assert obtain_token(client, code).status_code == HTTPStatus.OK, (
+            'Проверьте, что кэш ответов не вытесняет коды подтверждения.'
+        )
+
+    def test_06_expired_codes_are_purged(self, client, settings):
+        settings.CONFIRMATION_CODE_TIMEOUT = 1
+        signup(client)
+        time.sleep(1.1)
+        settings.CONFIRMATION_CODE_TIMEOUT = 60
+        client.post(URL_SIGNUP, data={
+            'email': 'other@yamdb.fake', 'username': 'other'
+        })
+        assert list(
+            ConfirmationCode.objects.values_list('user__username', flat=True)
+        ) == ['other'], (
+            'Проверьте, что выдача кода удаляет истёкшие коды.'
+        )
@@ -0,0 +1,142 @@
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+from django.db import OperationalError, connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.serializers import SignUpSerializer
+from users.models import User
+
+URL_SIGNUP = '/api/v1/auth/signup/'
+USERNAME_TAKEN = {'username': ['Username уже существует с другим email.']}
+EMAIL_TAKEN = {'email': ['Email уже зарегистрирован другим пользователем.']}
+
+
+def user_queries(context):
+    return [
+        query['sql'].split(' ', 1)[0] for query in context.captured_queries
+        if 'users_user' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28SignupConcurrency:
+
+    def test_01_one_select_and_one_insert(self, client, settings):
+        settings.EMAIL_OUTBOX_EAGER = False
+        data = {'username': 'single', 'email': 'single@yamdb.fake'}
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert user_queries(context) == ['SELECT', 'INSERT'], (
+            'Проверьте, что регистрация выполняет один SELECT и один '
+            'INSERT в таблицу пользователей.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.OK
+        assert user_queries(context) == ['SELECT']
+
+    def test_02_same_error_messages(self, client):
+        User.objects.create(username='taken', email='taken@yamdb.fake')
+        User.objects.create(username='other', email='other@yamdb.fake')
+        cases = [
+            ({'username': 'taken', 'email': 'new@yamdb.fake'},
+             USERNAME_TAKEN),
+            ({'username': 'new', 'email': 'taken@yamdb.fake'}, EMAIL_TAKEN),
+            ({'username': 'taken', 'email': 'other@yamdb.fake'},
+             {**USERNAME_TAKEN, **EMAIL_TAKEN}),
+        ]
+        for data, errors in cases:
+            response = client.post(URL_SIGNUP, data=data)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+            assert response.json() == errors
+
+    def test_03_lost_race_reports_conflict(self, client, monkeypatch):
+        find_conflicts = SignUpSerializer.find_conflicts
+        calls = []
+
+        def racing_find_conflicts(users, username, email):
+            # Параллельная регистрация вставляет строку между SELECT
+            # и INSERT.
+            if not calls:
+                User.objects.create(username=username, email='rival@x.fake')
+            calls.append(users)
+            return find_conflicts(users, username, email)
+
+        monkeypatch.setattr(
+            SignUpSerializer, 'find_conflicts',
+            staticmethod(racing_find_conflicts)
+        )
+        response = client.post(
+            URL_SIGNUP, data={'username': 'race', 'email': 'race@yamdb.fake'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что проигранная гонка регистрации возвращает 400, '
+            'а не 500.'
+        )
+        assert response.json() == USERNAME_TAKEN
+        assert len(calls) == 2
+
+    def test_04_concurrent_duplicate_signups(self):
+        requests = [
+            {'username': 'storm', 'email': 'storm@yamdb.fake'},
+            {'username': 'storm', 'email': 'other-storm@yamdb.fake'},
+            {'username': 'storm-2', 'email': 'storm@yamdb.fake'},
+        ] * 8
+        barrier = threading.Barrier(len(requests))
+        results = [None] * len(requests)
+
+        def signup(index, data):
+            try:
+                barrier.wait()
+                for _ in range(50):
+                    try:
+                        response = APIClient().post(URL_SIGNUP, data=data)
+                    except OperationalError as error:
+                        # Тестовая БД SQLite в памяти с общим кэшем
+                        # блокирует таблицы без ожидания, в отличие от
+                        # файловой БД; клиент просто повторяет запрос.
+                        if 'locked' not in str(error):
+                            raise
+                        time.sleep(0.01)
+                        continue
+                    results[index] = (response.status_code, response.json())
+                    break
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=signup, args=(index, data))
+            for index, data in enumerate(requests)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert None not in results
+        assert all(
+            status in (HTTPStatus.OK, HTTPStatus.BAD_REQUEST)
+            for status, _ in results
+        ), f'Параллельные регистрации завершились ошибкой: {results}'
+        users = set(User.objects.values_list('username', 'email'))
+        assert users, 'Проверьте, что регистрация создаёт пользователя.'
+        for (status, body), data in zip(results, requests):
+            pair = (data['username'], data['email'])
+            if status == HTTPStatus.OK:
+                assert pair in users, (
+                    'Проверьте, что успешная регистрация соответствует '
+                    'созданному пользователю.'
+                )
+                continue
+            assert pair not in users
+            assert body in (USERNAME_TAKEN, EMAIL_TAKEN,
+                            {**USERNAME_TAKEN, **EMAIL_TAKEN})
+            assert any(
+                username == pair[0] or email == pair[1]
+                for username, email in users
+            ), 'Проверьте, что отказ вызван существующим пользователем.'
@@ -0,0 +1,146 @@
+import multiprocessing
+import time
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.throttling import buckets
+from reviews.models import Title
+
+URL_SIGNUP = '/api/v1/auth/signup/'
+URL_TOKEN = '/api/v1/auth/token/'
+
+
+@pytest.fixture
+def throttle_rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates
+        }
+    return set_rates
+
+
+def take_tokens(key, attempts, results):
+    results.put(sum(
+        buckets.take(key, 10, 3600) is None for _ in range(attempts)
+    ))
+
+
+def signup(client, idx, **extra):
+    return client.post(URL_SIGNUP, data={
+        'username': f'user{idx}', 'email': f'user{idx}@yamdb.fake'
+    }, **extra)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29Throttling:
+
+    def test_01_auth_limited_per_ip(self, client, throttle_rates):
+        throttle_rates(auth='3/min')
+        for idx in range(3):
+            assert signup(client, idx).status_code == HTTPStatus.OK
+        response = signup(client, 3)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что регистрация ограничена по IP-адресу.'
+        )
+        assert int(response['Retry-After']) >= 1, (
+            'Проверьте, что отказ содержит заголовок Retry-After.'
+        )
+        response = signup(client, 4, REMOTE_ADDR='10.0.0.2')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что лимит считается отдельно для каждого IP-адреса.'
+        )
+        response = client.post(URL_TOKEN, data={})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    def test_02_code_guessing_limited_per_username(self, client, user,
+                                                   throttle_rates):
+        throttle_rates(auth='100/min', confirmation_code='2/min')
+        data = {'username': user.username, 'confirmation_code': '000000'}
+        statuses = [
+            client.post(
+                URL_TOKEN, data=data, REMOTE_ADDR=f'10.0.0.{idx}'
+            ).status_code
+            for idx in range(3)
+        ]
+        assert statuses == [
+            HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        ], (
+            'Проверьте, что подбор кода ограничен по username '
+            'независимо от IP-адреса.'
+        )
+        other = {'username': 'someone-else', 'confirmation_code': '000000'}
+        assert client.post(URL_TOKEN, data=other).status_code == (
+            HTTPStatus.NOT_FOUND
+        )
+
+    def test_03_review_posts_limited_per_user(self, user_client,
+                                              admin_client, throttle_rates):
+        throttle_rates(write='2/min', write_ip='100/min')
+        titles = [
+            Title.objects.create(name=f'Произведение {idx}', year=2000)
+            for idx in range(4)
+        ]
+        url = '/api/v1/titles/{}/reviews/'
+        data = {'text': 'Текст', 'score': 5}
+        for title in titles[:2]:
+            response = user_client.post(url.format(title.pk), data=data)
+            assert response.status_code == HTTPStatus.CREATED
+        response = user_client.post(url.format(titles[2].pk), data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что создание отзывов ограничено для пользователя.'
+        )
+        assert 'Retry-After' in response
+        assert user_client.get(url.format(titles[0].pk)).status_code == (
+            HTTPStatus.OK
+        ), 'Проверьте, что чтение отзывов не ограничивается.'
+        response = admin_client.post(url.format(titles[2].pk), data=data)
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что у каждого пользователя своя корзина.'
+        )
+
+    def test_04_bucket_refills(self, throttle_rates):
+        throttle_rates(auth='2/s')
+        client = APIClient()
+        statuses = [signup(client, idx).status_code for idx in range(3)]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS
+        time.sleep(0.6)
+        assert signup(client, 3).status_code == HTTPStatus.OK, (
+            'Проверьте, что корзина пополняется со временем.'
+        )
+
+    def test_05_forwarded_for_does_not_reset_bucket(self, client,
+                                                   throttle_rates):
+        throttle_rates(auth='2/min')
+        statuses = [
+            signup(
+                client, idx, HTTP_X_FORWARDED_FOR=f'10.1.0.{idx}'
+            ).status_code
+            for idx in range(3)
+        ]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что подделанный X-Forwarded-For не даёт '
+            'новую корзину.'
+        )
+
+
+def test_bucket_is_atomic_across_processes():
+    buckets.clear()
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=take_tokens, args=('test:concurrent', 10, results)
+        )
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    taken = sum(results.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join()
+    assert taken == 10, (
+        'Проверьте, что параллельные процессы не тратят один жетон дважды.'
+    )